@@ -0,0 +1,89 @@
+import heapq
+import numpy as np
+import pandas as pd
+from calculations import calculate_averaging_batch
+
+OBJECTIVES = {
+    "Reduce average cost the most per ₹": "avg_reduction",
+    "Reach target on most positions": "max_targets",
+}
+
+
+def allocate_budget(df, target_avg_price, budget, objective="avg_reduction", steps=20):
+    """
+    Spreads a total cash budget as whole-share purchases across the loss-making
+    rows of a validated portfolio DataFrame. No position is taken past the
+    shares calculate_averaging says it needs for its target.
+
+    objective="avg_reduction" buys greedily in tranches (each position's need
+    split into `steps` tranches), always taking the tranche with the largest
+    % cut in average price per rupee next, using a heap.
+    objective="max_targets" funds the cheapest full targets first, which
+    maximises the number of positions that reach their target.
+    """
+    qty = df["Current Quantity"].to_numpy(dtype=float)
+    avg = df["Current Average Price"].to_numpy(dtype=float)
+    market = df["Current Market Price"].to_numpy(dtype=float)
+    target = np.broadcast_to(np.asarray(target_avg_price, dtype=float), qty.shape)
+
+    needed, _, _, valid = calculate_averaging_batch(qty, avg, market, target)
+    eligible = valid & (market < avg) & (needed > 0) & (qty > 0)
+    needed = np.where(eligible, needed, 0)
+    capital_needed = needed * market
+
+    bought = np.zeros(len(qty), dtype=np.int64)
+    remaining = float(budget)
+
+    if objective == "max_targets":
+        order = np.argsort(np.where(eligible, capital_needed, np.inf), kind="stable")
+        order = order[eligible[order]]
+        funded = order[np.cumsum(capital_needed[order]) <= remaining]
+        bought[funded] = needed[funded]
+        remaining -= capital_needed[funded].sum()
+    elif objective == "avg_reduction":
+        total_cost = qty * avg
+        tranche = np.maximum(1, np.ceil(needed / steps)).astype(np.int64)
+
+        def tranche_score(i, k, size):
+            # % drop in average price per rupee for buying `size` more shares
+            before = (total_cost[i] + k * market[i]) / (qty[i] + k)
+            after = (total_cost[i] + (k + size) * market[i]) / (qty[i] + k + size)
+            return (before - after) / avg[i] / (size * market[i])
+
+        heap = []
+        for i in np.flatnonzero(eligible):
+            size = min(tranche[i], needed[i])
+            heap.append((-tranche_score(i, 0, size), i, size))
+        heapq.heapify(heap)
+
+        while heap:
+            _, i, size = heapq.heappop(heap)
+            affordable = int(remaining // market[i])
+            if affordable <= 0:
+                continue
+            size = min(size, affordable)
+            bought[i] += size
+            remaining -= size * market[i]
+            left = needed[i] - bought[i]
+            if left > 0:
+                size = min(tranche[i], left)
+                heapq.heappush(heap, (-tranche_score(i, bought[i], size), i, size))
+    else:
+        raise ValueError(f"Unknown allocation objective: {objective}")
+
+    new_qty = qty + bought
+    with np.errstate(divide="ignore", invalid="ignore"):
+        new_avg = (qty * avg + bought * market) / new_qty
+
+    result = pd.DataFrame({
+        "Stock": df["Stock"].to_numpy(),
+        "Current Average Price": np.round(avg, 2),
+        "Current Market Price": np.round(market, 2),
+        "Target Average Price": np.round(target, 2),
+        "Shares for Target": needed,
+        "Shares to Buy": bought,
+        "Capital Used": np.round(bought * market, 2),
+        "New Average Price": np.round(new_avg, 2),
+        "Reaches Target": eligible & (bought >= needed),
+    })
+    return result[eligible].reset_index(drop=True), round(remaining, 2)
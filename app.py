@@ -1,7 +1,12 @@
 import streamlit as st
 from calculations import calculate_averaging
-from portfolio_uploader import portfolio_upload_ui
+from portfolio_uploader import portfolio_upload_ui, strategy_param_inputs
+from strategy_backtest import strategy_backtest_ui
+from ladder_planner import ladder_planner_ui
+from whatif_grid import whatif_grid_ui
 from data_handler import validate_inputs
+from charges import buy_cost_coefficients
+from strategies import strategy_labels, strategy_key, compute_target_prices, explain_target
 
 # Page config with custom theme - MUST be the first Streamlit command
 st.set_page_config(
@@ -171,7 +176,7 @@ with st.sidebar:
     st.markdown("---")
     
     # Navigation with icons
-    menu = ["Single Stock Calculator", "Batch Portfolio Averaging"]
+    menu = ["Single Stock Calculator", "Batch Portfolio Averaging", "Strategy Backtest"]
     choice = st.selectbox("📊 Choose Mode", menu)
     
     st.markdown("---")
@@ -341,35 +346,18 @@ if choice == "Single Stock Calculator":
             st.markdown("### 💡 Averaging Strategy")
             strategy = st.selectbox(
                 "Select a Strategy",
-                [
-                    "Manual Input",
-                    "Mean of Current Avg & Market Price",
-                    "10% Below Current Avg",
-                    "5% Above Market Price"
-                ],
+                ["Manual Input"] + strategy_labels(),
                 help="Choose your preferred averaging strategy"
             )
 
         # Strategy calculations with enhanced visual feedback
-        if strategy == "Mean of Current Avg & Market Price":
-            target_avg_price = round((current_avg_price + market_price) / 2, 2)
+        if strategy != "Manual Input":
+            key = strategy_key(strategy)
+            strategy_params = strategy_param_inputs(key, "single_")
+            target_avg_price = round(float(compute_target_prices(key, current_avg_price, market_price, **strategy_params)), 2)
             st.markdown(f"""
                 <div class='info-message'>
-                    📘 Strategy: Average of ₹{current_avg_price} and ₹{market_price} → ₹{target_avg_price}
-                </div>
-            """, unsafe_allow_html=True)
-        elif strategy == "10% Below Current Avg":
-            target_avg_price = round(current_avg_price * 0.90, 2)
-            st.markdown(f"""
-                <div class='info-message'>
-                    📘 Strategy: 10% below current average ₹{current_avg_price} → ₹{target_avg_price}
-                </div>
-            """, unsafe_allow_html=True)
-        elif strategy == "5% Above Market Price":
-            target_avg_price = round(market_price * 1.05, 2)
-            st.markdown(f"""
-                <div class='info-message'>
-                    📘 Strategy: 5% above market price ₹{market_price} → ₹{target_avg_price}
+                    📘 Strategy: {explain_target(key, current_avg_price, market_price, target_avg_price, **strategy_params)}
                 </div>
             """, unsafe_allow_html=True)
         else:
@@ -380,6 +368,11 @@ if choice == "Single Stock Calculator":
                 help="Enter your target average price"
             )
 
+        include_charges = st.checkbox(
+            "Include transaction charges (STT, exchange fees, GST, stamp duty)",
+            value=False
+        )
+
         submitted = st.form_submit_button("Calculate")
 
     if submitted:
@@ -391,7 +384,8 @@ if choice == "Single Stock Calculator":
                 </div>
             """, unsafe_allow_html=True)
         else:
-            result = calculate_averaging(current_qty, current_avg_price, market_price, target_avg_price)
+            charges = buy_cost_coefficients() if include_charges else (0.0, 0)
+            result = calculate_averaging(current_qty, current_avg_price, market_price, target_avg_price, *charges)
             shares_to_buy, new_avg, estimated_profit = result
 
             if shares_to_buy is None:
@@ -430,9 +424,17 @@ if choice == "Single Stock Calculator":
                         </div>
                     """, unsafe_allow_html=True)
 
+    if validate_inputs(current_qty, current_avg_price, market_price, target_avg_price)[0]:
+        ladder_planner_ui(current_qty, current_avg_price, market_price, target_avg_price)
+        whatif_grid_ui(current_qty, current_avg_price, market_price, target_avg_price)
+
+
 elif choice == "Batch Portfolio Averaging":
     portfolio_upload_ui()
 
+elif choice == "Strategy Backtest":
+    strategy_backtest_ui()
+
 # Remove the old simple footer and add a new professional footer at the end of the file
 st.markdown('''
 <hr style="margin-top: 3rem; margin-bottom: 1.5rem; border: none; border-top: 1px solid #e0e0e0;" />
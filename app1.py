@@ -1,7 +1,13 @@
 import streamlit as st
 from calculations import calculate_averaging
-from portfolio_uploader import portfolio_upload_ui
+from portfolio_uploader import portfolio_upload_ui, strategy_param_inputs
+from strategy_backtest import strategy_backtest_ui
+from ladder_planner import ladder_planner_ui
+from whatif_grid import whatif_grid_ui
+from outcome_simulator import outcome_simulator_ui
 from data_handler import validate_inputs
+from charges import buy_cost_coefficients
+from strategies import strategy_labels, strategy_key, compute_target_prices, explain_target
 from fetch_price import get_live_price
 from risk_analyzer import analyze_stock_risk
 
@@ -184,7 +190,7 @@ with st.sidebar:
     st.markdown("---")
     
     # Navigation with icons
-    menu = ["Single Stock Calculator", "Batch Portfolio Averaging"]
+    menu = ["Single Stock Calculator", "Batch Portfolio Averaging", "Strategy Backtest"]
     choice = st.selectbox("📊 Choose Mode", menu)
     
     st.markdown("---")
@@ -380,7 +386,7 @@ if choice == "Single Stock Calculator":
             # )
             fetch_price_btn = st.form_submit_button("Fetch Live Price")
             if fetch_price_btn and stock_code:
-                live_price = get_live_price(stock_code)
+                live_price = get_live_price(stock_code, bypass_cache=True)
                 if live_price is not None:
                     st.session_state['market_price'] = float(live_price)
                     st.session_state['live_price'] = float(live_price)
@@ -411,35 +417,18 @@ if choice == "Single Stock Calculator":
             st.markdown("### 💡 Averaging Strategy")
             strategy = st.selectbox(
                 "Select a Strategy",
-                [
-                    "Manual Input",
-                    "Mean of Current Avg & Market Price",
-                    "10% Below Current Avg",
-                    "5% Above Market Price"
-                ],
+                ["Manual Input"] + strategy_labels(),
                 help="Choose your preferred averaging strategy"
             )
 
         # Strategy calculations with enhanced visual feedback
-        if strategy == "Mean of Current Avg & Market Price":
-            target_avg_price = round((current_avg_price + market_price) / 2, 2)
+        if strategy != "Manual Input":
+            key = strategy_key(strategy)
+            strategy_params = strategy_param_inputs(key, "single_")
+            target_avg_price = round(float(compute_target_prices(key, current_avg_price, market_price, **strategy_params)), 2)
             st.markdown(f"""
                 <div class='info-message'>
-                    📘 Strategy: Average of ₹{current_avg_price} and ₹{market_price} → ₹{target_avg_price}
-                </div>
-            """, unsafe_allow_html=True)
-        elif strategy == "10% Below Current Avg":
-            target_avg_price = round(current_avg_price * 0.90, 2)
-            st.markdown(f"""
-                <div class='info-message'>
-                    📘 Strategy: 10% below current average ₹{current_avg_price} → ₹{target_avg_price}
-                </div>
-            """, unsafe_allow_html=True)
-        elif strategy == "5% Above Market Price":
-            target_avg_price = round(market_price * 1.05, 2)
-            st.markdown(f"""
-                <div class='info-message'>
-                    📘 Strategy: 5% above market price ₹{market_price} → ₹{target_avg_price}
+                    📘 Strategy: {explain_target(key, current_avg_price, market_price, target_avg_price, **strategy_params)}
                 </div>
             """, unsafe_allow_html=True)
         else:
@@ -450,6 +439,11 @@ if choice == "Single Stock Calculator":
                 help="Enter your target average price"
             )
 
+        include_charges = st.checkbox(
+            "Include transaction charges (STT, exchange fees, GST, stamp duty)",
+            value=False
+        )
+
         submitted = st.form_submit_button("Calculate")
 
     if submitted:
@@ -461,7 +455,8 @@ if choice == "Single Stock Calculator":
                 </div>
             """, unsafe_allow_html=True)
         else:
-            result = calculate_averaging(current_qty, current_avg_price, market_price, target_avg_price)
+            charges = buy_cost_coefficients() if include_charges else (0.0, 0)
+            result = calculate_averaging(current_qty, current_avg_price, market_price, target_avg_price, *charges)
             shares_to_buy, new_avg, estimated_profit = result
 
             if shares_to_buy is None:
@@ -500,6 +495,14 @@ if choice == "Single Stock Calculator":
                         </div>
                     """, unsafe_allow_html=True)
 
+    if validate_inputs(current_qty, current_avg_price, market_price, target_avg_price)[0]:
+        ladder_planner_ui(current_qty, current_avg_price, market_price, target_avg_price)
+        whatif_grid_ui(current_qty, current_avg_price, market_price, target_avg_price)
+        ra = st.session_state['risk_analysis']
+        if ra and ra['volatility'] is not None:
+            outcome_simulator_ui(current_qty, current_avg_price, market_price, target_avg_price, ra['volatility'])
+
+
 
 
 
@@ -512,21 +515,37 @@ elif choice == "Batch Portfolio Averaging":
         </div>
     """, unsafe_allow_html=True)
 
-    uploaded_file = st.file_uploader("Upload Excel file with columns: Stock, Avg Price, Quantity, P/L", type=['xlsx'])
+    uploaded_files = st.file_uploader(
+        "Upload Excel file with columns: Stock, Avg Price, Quantity, P/L (one file per account is fine)",
+        type=['xlsx'],
+        accept_multiple_files=True
+    )
 
-    if uploaded_file:
+    if uploaded_files:
         import pandas as pd
-        df = pd.read_excel(uploaded_file)
+        from data_handler import read_excel_fast, consolidate_holdings
         required_columns = ['Stock', 'Quantity', 'Avg Price', 'P/L']
-        df.columns = [col.strip() for col in df.columns]  # Remove spaces
+        frames = []
+        for uploaded_file in uploaded_files:
+            df = read_excel_fast(uploaded_file)
+            df.columns = [col.strip() for col in df.columns]  # Remove spaces
+
+            # Check if all required columns are present
+            if not all(col in df.columns for col in required_columns):
+                st.error(f"Invalid format in {uploaded_file.name}. Required columns: {', '.join(required_columns)}")
+                st.stop()
 
-        # Check if all required columns are present
-        if not all(col in df.columns for col in required_columns):
-            st.error(f"Invalid format. Required columns: {', '.join(required_columns)}")
-            st.stop()
+            # Reorder columns for consistency
+            frames.append(df[required_columns])
 
-        # Reorder columns for consistency
-        df = df[required_columns]
+        # The same stock held in several accounts becomes one position, so it is
+        # priced and risk-checked once
+        df = consolidate_holdings(
+            pd.concat(frames, ignore_index=True),
+            quantity='Quantity',
+            average='Avg Price',
+            sums=('P/L',)
+        )
 
 
         if {'Stock', 'Avg Price', 'Quantity', 'P/L'}.issubset(df.columns):
@@ -535,55 +554,78 @@ elif choice == "Batch Portfolio Averaging":
 
             strategy = st.selectbox(
                 "Select Averaging Strategy",
-                ["Mean of Avg & Market", "10% Below Avg", "5% Above Market"]
+                strategy_labels()
             )
-
-            results = []
-
-            for idx, row in df.iterrows():
-                stock = row['Stock']
-                avg_price = row['Avg Price']
-                qty = row['Quantity']
-
-                # Get market price
-                from fetch_price import get_live_price
-                market_price = get_live_price(stock)
-                if not market_price:
-                    continue
-
-                if strategy == "Mean of Avg & Market":
-                    target_price = round((avg_price + market_price) / 2, 2)
-                elif strategy == "10% Below Avg":
-                    target_price = round(avg_price * 0.90, 2)
-                else:
-                    target_price = round(market_price * 1.05, 2)
-
-                from calculations import calculate_averaging
-                shares, new_avg, est_profit = calculate_averaging(qty, avg_price, market_price, target_price)
-
-                from risk_analyzer import analyze_stock_risk
-                risk = analyze_stock_risk(stock)
-
-                results.append({
-                    'Stock': stock,
-                    'Current Avg': avg_price,
-                    'Market Price': market_price,
-                    'Target Avg': target_price,
-                    'Buy Qty': shares,
-                    'New Avg': new_avg,
-                    'Est. Profit': est_profit,
-                    'Risk': risk.get("risk_level", "Unknown"),
-                    'Rating': risk.get("fundamentals_rating", "Unknown"),
-                    'Allowed': '✅' if risk.get("allowed") else '❌'
-                })
-
-            if results:
+            strategy_params = strategy_param_inputs(strategy_key(strategy), "risk_batch_")
+
+            from result_table import RISK_RESULT_SCHEMA, ResultTable
+            results = ResultTable(RISK_RESULT_SCHEMA, len(df))
+
+            # Get market prices first (one bulk lookup) so the averaging math runs once over all rows
+            from fetch_price import get_live_prices
+            live_prices, price_errors, price_latency = get_live_prices(df['Stock'])
+            if price_latency["calls"]:
+                st.caption(
+                    f"⏱️ {price_latency['calls']} price requests · p50 {price_latency['p50_ms']:.0f} ms · "
+                    f"p90 {price_latency['p90_ms']:.0f} ms · p99 {price_latency['p99_ms']:.0f} ms"
+                )
+            if price_errors:
+                with st.expander(f"⚠️ No live price for {len(price_errors)} stocks", expanded=False):
+                    st.dataframe(pd.DataFrame(list(price_errors.items()), columns=['Stock', 'Reason']), hide_index=True)
+            market_price = df['Stock'].map(live_prices)
+            has_price = market_price.notna() & (market_price != 0)
+            priced_rows = list(zip(
+                df.loc[has_price, 'Stock'],
+                df.loc[has_price, 'Avg Price'],
+                df.loc[has_price, 'Quantity'],
+                market_price[has_price]
+            ))
+
+            if priced_rows:
+                import numpy as np
+                from calculations import calculate_averaging_batch
+                from risk_analyzer import analyze_stocks_risk
+
+                stocks = [r[0] for r in priced_rows]
+                avg_prices = np.array([r[1] for r in priced_rows], dtype=float)
+                qtys = np.array([r[2] for r in priced_rows], dtype=float)
+                market_prices = np.array([r[3] for r in priced_rows], dtype=float)
+
+                target_prices = np.round(compute_target_prices(strategy_key(strategy), avg_prices, market_prices, **strategy_params), 2)
+
+                shares, new_avgs, est_profits, valid = calculate_averaging_batch(qtys, avg_prices, market_prices, target_prices)
+
+                # Risk lookups have no bulk endpoint: multiplex them on one event loop within Yahoo's limits
+                risks, risk_latency = analyze_stocks_risk(stocks)
+                if risk_latency["calls"]:
+                    st.caption(
+                        f"⏱️ {risk_latency['calls']} risk lookups · p50 {risk_latency['p50_ms']:.0f} ms · "
+                        f"p90 {risk_latency['p90_ms']:.0f} ms · p99 {risk_latency['p99_ms']:.0f} ms"
+                    )
+
+                for i, stock in enumerate(stocks):
+                    risk = risks.get(stock) or {}
+
+                    results.append({
+                        'Stock': stock,
+                        'Current Avg': priced_rows[i][1],
+                        'Market Price': priced_rows[i][3],
+                        'Target Avg': float(target_prices[i]),
+                        'Buy Qty': int(shares[i]) if valid[i] else None,
+                        'New Avg': float(new_avgs[i]) if valid[i] else None,
+                        'Est. Profit': float(est_profits[i]) if valid[i] else None,
+                        'Risk': risk.get("risk_level", "Unknown"),
+                        'Rating': risk.get("fundamentals_rating", "Unknown"),
+                        'Allowed': '✅' if risk.get("allowed") else '❌'
+                    })
+
+            if results.size:
                 st.markdown("""
                     <div style='margin: 2rem 0;'>
                         <h3 style='text-align: center; color: #1f1f1f; margin-bottom: 1.5rem;'>📊 Averaging Summary with Risk</h3>
                     </div>
                 """, unsafe_allow_html=True)
-                results_df = pd.DataFrame(results)
+                results_df = results.to_frame()
                 st.dataframe(results_df)
 
                 # Download button
@@ -600,6 +642,10 @@ elif choice == "Batch Portfolio Averaging":
             st.error("❌ Invalid format. Required columns: Stock, Avg Price, Quantity, P/L")
 
 
+elif choice == "Strategy Backtest":
+    strategy_backtest_ui()
+
+
 # elif choice == "Batch Portfolio Averaging":
 #     st.markdown("""
 #         <div style='text-align: center; margin: 2rem 0;'>
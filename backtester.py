@@ -0,0 +1,146 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+import pandas as pd
+import yfinance as yf
+from calculations import calculate_averaging_batch
+from strategies import STRATEGIES, compute_target_prices
+
+DEFAULT_STRATEGIES = ("mean", "below_avg", "above_market")
+
+
+def load_closes(symbols, years=10):
+    """Daily closes for NSE symbols as a dates x symbols DataFrame."""
+    tickers = [s.strip().upper() + ".NS" for s in symbols]
+    closes = yf.download(tickers, period=f"{years}y", interval="1d", auto_adjust=True, progress=False)["Close"]
+    if isinstance(closes, pd.Series):
+        closes = closes.to_frame(tickers[0])
+    closes.columns = [c[:-3] if c.endswith(".NS") else c for c in closes.columns]
+    return closes
+
+
+def _backtest_block(prices, strategy_keys, initial_capital, trigger_pct, max_rounds, min_gap_days):
+    # prices is (days, symbols); every state array is (strategies, symbols)
+    days, n = prices.shape
+    shape = (len(strategy_keys), n)
+
+    started = np.zeros(n, dtype=bool)
+    qty = np.zeros(shape)
+    avg = np.zeros(shape)
+    deployed = np.zeros(shape)
+    rounds = np.zeros(shape, dtype=np.int64)
+    last_buy = np.full(shape, -min_gap_days, dtype=np.int64)
+    underwater_since = np.full(shape, -1, dtype=np.int64)
+    recovery_days = np.zeros(shape, dtype=np.int64)
+    recoveries = np.zeros(shape, dtype=np.int64)
+    max_drawdown = np.zeros(shape)
+    last_price = np.full(n, np.nan)
+
+    for t in range(days):
+        price = prices[t]
+        has_price = ~np.isnan(price)
+        last_price = np.where(has_price, price, last_price)
+
+        # Open the initial position on each symbol's first trading day
+        opening = has_price & ~started
+        if opening.any():
+            initial_qty = np.maximum(1, np.floor(initial_capital / np.where(opening, price, 1.0)))
+            qty[:, opening] = initial_qty[opening]
+            avg[:, opening] = price[opening]
+            deployed[:, opening] = (initial_qty * price)[opening]
+            started |= opening
+
+        active = np.broadcast_to(started & has_price, shape)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            drawdown = np.where(active, price / avg - 1, 0.0)
+        np.minimum(max_drawdown, drawdown, out=max_drawdown)
+
+        below = active & (price < avg)
+        underwater_since = np.where(below & (underwater_since < 0), t, underwater_since)
+        recovered = active & ~below & (underwater_since >= 0)
+        recovery_days += np.where(recovered, t - underwater_since, 0)
+        recoveries += recovered
+        underwater_since = np.where(recovered, -1, underwater_since)
+
+        trigger = (
+            active
+            & (price <= avg * (1 - trigger_pct / 100))
+            & (rounds < max_rounds)
+            & (t - last_buy >= min_gap_days)
+        )
+        if not trigger.any():
+            continue
+
+        market = np.broadcast_to(price, shape)
+        targets = np.stack([compute_target_prices(key, avg[s], price) for s, key in enumerate(strategy_keys)])
+        shares, new_avg, _, valid = calculate_averaging_batch(qty, avg, market, targets)
+        buy = trigger & valid & (shares > 0)
+
+        deployed += np.where(buy, shares * market, 0.0)
+        avg = np.where(buy, new_avg, avg)
+        qty += np.where(buy, shares, 0)
+        rounds += buy
+        last_buy = np.where(buy, t, last_buy)
+
+    still_underwater = underwater_since >= 0
+    value = qty * last_price
+    return {
+        "Capital Deployed": deployed,
+        "Averaging Rounds": rounds,
+        "Final Average": avg,
+        "Final Value": value,
+        "P&L": value - deployed,
+        "Max Drawdown %": max_drawdown * 100,
+        "Recoveries": recoveries,
+        "Avg Days to Recover": np.where(recoveries > 0, recovery_days / np.maximum(recoveries, 1), np.nan),
+        "Underwater at End": still_underwater,
+        "Days Underwater at End": np.where(still_underwater, days - 1 - underwater_since, 0),
+    }
+
+
+def _run_block(args):
+    return _backtest_block(*args)
+
+
+def run_backtest(closes, strategy_keys=DEFAULT_STRATEGIES, initial_capital=100_000, trigger_pct=10,
+                 max_rounds=3, min_gap_days=20, processes=None, block_size=100):
+    """
+    Replays daily closes (dates x symbols DataFrame) for every strategy at once.
+    Each symbol opens with ~initial_capital worth of shares on its first close;
+    whenever a position is trigger_pct below its average it is averaged with
+    calculate_averaging towards the strategy's target, at most max_rounds times
+    and no more than once every min_gap_days.
+
+    Days are replayed in order, but each day is one vectorized step across all
+    symbols and strategies. With processes > 1, blocks of block_size symbols run
+    in a process pool. Returns one row per (strategy, stock).
+    """
+    prices = closes.to_numpy(dtype=np.float64)
+    symbols = list(closes.columns)
+    blocks = [
+        (prices[:, i:i + block_size], tuple(strategy_keys), initial_capital, trigger_pct, max_rounds, min_gap_days)
+        for i in range(0, len(symbols), block_size)
+    ]
+
+    if processes and processes > 1 and len(blocks) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            outputs = list(pool.map(_run_block, blocks))
+    else:
+        outputs = [_run_block(block) for block in blocks]
+
+    frames = []
+    for s, key in enumerate(strategy_keys):
+        metrics = {name: np.concatenate([out[name][s] for out in outputs]) for name in outputs[0]}
+        frames.append(pd.DataFrame({"Strategy": STRATEGIES[key]["label"], "Stock": symbols, **metrics}))
+    return pd.concat(frames, ignore_index=True)
+
+
+def summarize_backtest(results):
+    """Per-strategy totals and medians from run_backtest results."""
+    return results.groupby("Strategy", sort=False).agg(
+        Stocks=("Stock", "count"),
+        Capital_Deployed=("Capital Deployed", "sum"),
+        Total_PnL=("P&L", "sum"),
+        Median_Max_Drawdown_Pct=("Max Drawdown %", "median"),
+        Median_Days_to_Recover=("Avg Days to Recover", "median"),
+        Underwater_at_End=("Underwater at End", "sum"),
+    ).reset_index()
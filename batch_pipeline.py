@@ -0,0 +1,74 @@
+import argparse
+import time
+import pandas as pd
+from calculations import calculate_averaging_batch
+from data_handler import iter_validated_chunks
+from strategies import STRATEGIES, compute_target_prices
+
+
+def run_streaming_averaging(source, strategy="mean", output=None, chunksize=200_000, fetch_missing=True, **params):
+    """
+    Runs the averaging calculation over a portfolio file chunk by chunk, so
+    memory stays bounded by one chunk however large the file is. Results are
+    appended to `output` (a CSV path) when given. Returns summary stats,
+    including throughput in rows per second.
+    """
+    stats = {
+        "rows": 0,
+        "rows_dropped": 0,
+        "loss_positions": 0,
+        "reachable_targets": 0,
+        "shares_to_buy": 0,
+        "capital_required": 0.0,
+    }
+    started = time.perf_counter()
+    header = True
+
+    for chunk, dropped in iter_validated_chunks(source, chunksize=chunksize, fetch_missing=fetch_missing):
+        qty = chunk["Current Quantity"].to_numpy()
+        avg = chunk["Current Average Price"].to_numpy()
+        market = chunk["Current Market Price"].to_numpy()
+
+        target = compute_target_prices(strategy, avg, market, chunk, **params)
+        shares, new_avg, profit, valid = calculate_averaging_batch(qty, avg, market, target)
+        suggest = (market < avg) & valid
+
+        stats["rows"] += len(chunk)
+        stats["rows_dropped"] += dropped
+        stats["loss_positions"] += int((market < avg).sum())
+        stats["reachable_targets"] += int(suggest.sum())
+        stats["shares_to_buy"] += int(shares[suggest].sum())
+        stats["capital_required"] += float((shares * market)[suggest].sum())
+
+        if output:
+            pd.DataFrame({
+                "Stock": chunk["Stock"].to_numpy(),
+                "Current Quantity": qty,
+                "Current Average Price": avg.round(2),
+                "Current Market Price": market.round(2),
+                "Target Average Price": target.round(2),
+                "Shares to Buy": pd.Series(shares, dtype="Int64").where(suggest),
+                "New Average Price": new_avg.round(2),
+                "Estimated Profit": profit.round(2),
+            }).to_csv(output, mode="w" if header else "a", header=header, index=False)
+            header = False
+
+    stats["seconds"] = time.perf_counter() - started
+    stats["rows_per_second"] = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    return stats
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Stream a large portfolio file through the averaging calculator.")
+    parser.add_argument("source", help="CSV or XLSX portfolio export")
+    parser.add_argument("--strategy", default="mean", choices=[key for key in STRATEGIES if not STRATEGIES[key]["requires"]])
+    parser.add_argument("--output", help="CSV file to write per-row results to")
+    parser.add_argument("--chunksize", type=int, default=200_000)
+    parser.add_argument("--no-fetch", action="store_true", help="Do not fetch live prices for blank market prices")
+    args = parser.parse_args()
+
+    stats = run_streaming_averaging(
+        args.source, args.strategy, args.output, args.chunksize, fetch_missing=not args.no_fetch
+    )
+    for name, value in stats.items():
+        print(f"{name}: {value:,.2f}" if isinstance(value, float) else f"{name}: {value:,}")
@@ -0,0 +1,55 @@
+import argparse
+import os
+import tempfile
+import time
+import numpy as np
+import pandas as pd
+from data_handler import HAS_CALAMINE, read_excel_openpyxl_values
+
+
+def write_workbook(path, rows, seed=0):
+    from openpyxl import Workbook
+
+    rng = np.random.default_rng(seed)
+    avg = rng.uniform(10, 3000, rows).round(2)
+    market = (avg * rng.uniform(0.5, 1.3, rows)).round(2)
+    qty = rng.integers(1, 1000, rows)
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet()
+    sheet.append(["Stock Name", "Quantity", "Average buy price", "Closing price"])
+    for i in range(rows):
+        sheet.append([f"STOCK{i % 2000}", int(qty[i]), float(avg[i]), float(market[i])])
+    workbook.save(path)
+
+
+def time_reader(read, path, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        df = read(path)
+        best = min(best, time.perf_counter() - started)
+    return best, len(df)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare XLSX reader backends on synthetic broker exports.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=1)
+    args = parser.parse_args()
+
+    readers = {
+        "pandas + openpyxl": lambda path: pd.read_excel(path, engine="openpyxl"),
+        "openpyxl read-only values": read_excel_openpyxl_values,
+    }
+    if HAS_CALAMINE:
+        readers["pandas + calamine"] = lambda path: pd.read_excel(path, engine="calamine")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        for rows in args.sizes:
+            path = os.path.join(tmp, f"portfolio_{rows}.xlsx")
+            write_workbook(path, rows)
+            print(f"\n{rows:,} rows ({os.path.getsize(path) / 1e6:.1f} MB)")
+            for name, read in readers.items():
+                seconds, n = time_reader(read, path, args.repeat)
+                print(f"  {name:<28} {seconds:8.2f} s  {n / seconds:12,.0f} rows/s")
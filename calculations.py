@@ -1,22 +1,22 @@
-
-
-
 import math
+import numpy as np
 
-def calculate_averaging(current_qty, current_avg_price, market_price, target_avg_price):
+def calculate_averaging(current_qty, current_avg_price, market_price, target_avg_price, buy_cost_rate=0.0, order_cost=0):
+    # buy_cost_rate / order_cost fold transaction charges into the buy (see charges.py)
     total_cost = current_qty * current_avg_price
+    buy_price = market_price * (1 + buy_cost_rate) if buy_cost_rate else market_price
 
-    if target_avg_price == market_price:
+    if target_avg_price == buy_price:
         shares_to_buy, new_avg = 0, current_avg_price
-    elif target_avg_price > market_price:
-        numerator = target_avg_price * current_qty - total_cost
-        denominator = market_price - target_avg_price
+    elif target_avg_price > buy_price:
+        numerator = target_avg_price * current_qty - total_cost - order_cost
+        denominator = buy_price - target_avg_price
         if denominator == 0 or numerator / denominator < 0:
             return None, None, None
         shares_to_buy = math.ceil(numerator / denominator)
     else:
-        numerator = total_cost - target_avg_price * current_qty
-        denominator = target_avg_price - market_price
+        numerator = total_cost + order_cost - target_avg_price * current_qty
+        denominator = target_avg_price - buy_price
         if denominator == 0 or numerator / denominator < 0:
             return None, None, None
         shares_to_buy = math.ceil(numerator / denominator)
@@ -25,7 +25,182 @@ def calculate_averaging(current_qty, current_avg_price, market_price, target_avg
     if new_total_qty == 0:
         return None, None, None
 
-    new_avg = (total_cost + shares_to_buy * market_price) / new_total_qty
+    charges = order_cost if shares_to_buy else 0
+    new_avg = (total_cost + shares_to_buy * buy_price + charges) / new_total_qty
     estimated_profit = (target_avg_price - new_avg) * new_total_qty
 
     return shares_to_buy, new_avg, estimated_profit
+
+
+def calculate_averaging_batch(current_qty, current_avg_price, market_price, target_avg_price,
+                              buy_cost_rate=0.0, order_cost=0.0):
+    """
+    Column-wise version of calculate_averaging for whole portfolios.
+    Takes array-likes (or scalars that broadcast), including per-row
+    buy_cost_rate / order_cost charge coefficients, and returns
+    (shares_to_buy, new_avg, estimated_profit, valid) as NumPy arrays.
+    Rows where calculate_averaging would return (None, None, None) have
+    valid=False, shares_to_buy=0 and NaN for new_avg / estimated_profit.
+    """
+    qty, avg, market, target, rate, fixed = np.broadcast_arrays(
+        np.asarray(current_qty, dtype=np.float64),
+        np.asarray(current_avg_price, dtype=np.float64),
+        np.asarray(market_price, dtype=np.float64),
+        np.asarray(target_avg_price, dtype=np.float64),
+        np.asarray(buy_cost_rate, dtype=np.float64),
+        np.asarray(order_cost, dtype=np.float64),
+    )
+    total_cost = qty * avg
+    buy_price = np.where(rate != 0, market * (1 + rate), market)
+
+    # Both non-trivial branches of the scalar version reduce to the same ratio:
+    # (total_cost - t*q) / (t - m) is (t*q - total_cost) / (m - t) with both
+    # signs flipped, which is exact in IEEE arithmetic.
+    at_market = target == buy_price
+    with np.errstate(divide="ignore", invalid="ignore"):
+        ratio = (target * qty - total_cost - fixed) / (buy_price - target)
+    ratio = np.where(at_market, 0.0, ratio)
+
+    valid = np.isfinite(ratio) & (ratio >= 0)
+    valid &= np.isfinite(total_cost) & np.isfinite(buy_price) & np.isfinite(target)
+    shares = np.where(valid, np.ceil(np.where(valid, ratio, 0.0)), 0.0)
+
+    new_total_qty = qty + shares
+    valid &= new_total_qty != 0
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        new_avg = (total_cost + shares * buy_price + np.where(shares > 0, fixed, 0.0)) / new_total_qty
+    estimated_profit = (target - new_avg) * new_total_qty
+
+    shares = np.where(valid, shares, 0).astype(np.int64)
+    new_avg = np.where(valid, new_avg, np.nan)
+    estimated_profit = np.where(valid, estimated_profit, np.nan)
+    return shares, new_avg, estimated_profit, valid
+
+
+def plan_buy_ladder(current_qty, current_avg_price, market_price, target_avg_price, rungs, step_pct):
+    """
+    Plans equal-sized buys at `rungs` falling price levels, each `step_pct`
+    percent below the previous level starting from market_price, so that the
+    average lands at (or just under) target_avg_price once every rung fills.
+
+    `rungs` and `step_pct` may be arrays of configurations to sweep; every
+    returned array has shape (configs, max_rungs), padded with zeros/NaN past
+    each configuration's last rung:
+    (prices, shares, cumulative_qty, running_avg, cumulative_capital, valid)
+    """
+    rungs = np.atleast_1d(np.asarray(rungs, dtype=np.int64))
+    step = np.atleast_1d(np.asarray(step_pct, dtype=np.float64)) / 100
+    rungs, step = np.broadcast_arrays(rungs, step)
+    max_rungs = max(int(rungs.max()), 1)
+
+    level = np.arange(max_rungs)
+    in_ladder = level[None, :] < rungs[:, None]
+    prices = market_price * (1 - step[:, None]) ** level[None, :]
+    in_ladder &= prices > 0
+    prices = np.where(in_ladder, prices, np.nan)
+
+    # Buying k shares at every rung is the same as buying rungs*k shares at the
+    # mean rung price, so the single-price solution gives the total directly.
+    n_rungs = in_ladder.sum(axis=1)
+    mean_price = np.nansum(prices, axis=1) / np.maximum(n_rungs, 1)
+    total_shares, _, _, valid = calculate_averaging_batch(
+        current_qty, current_avg_price, mean_price, target_avg_price
+    )
+    valid &= (n_rungs == rungs) & (rungs > 0)
+    per_rung = np.where(valid, np.ceil(total_shares / np.maximum(n_rungs, 1)), 0)
+
+    shares = np.where(in_ladder & valid[:, None], per_rung[:, None], 0).astype(np.int64)
+    cumulative_qty = current_qty + np.cumsum(shares, axis=1)
+    cumulative_capital = np.cumsum(np.where(shares > 0, shares * prices, 0.0), axis=1)
+    running_avg = (current_qty * current_avg_price + cumulative_capital) / cumulative_qty
+    running_avg = np.where(in_ladder, running_avg, np.nan)
+    return prices, shares, cumulative_qty, running_avg, cumulative_capital, valid
+
+
+def averaging_grid(current_qty, current_avg_price, market_prices, target_prices):
+    """
+    What-if surface over every (market price, target average) pair.
+    Returns (shares_to_buy, capital_required, valid), each shaped
+    (len(market_prices), len(target_prices)); unreachable cells are NaN.
+    """
+    market = np.asarray(market_prices, dtype=np.float64)[:, None]
+    target = np.asarray(target_prices, dtype=np.float64)[None, :]
+    shares, _, _, valid = calculate_averaging_batch(current_qty, current_avg_price, market, target)
+    shares = np.where(valid, shares, np.nan)
+    return shares, shares * market, valid
+
+
+def to_paise(rupees):
+    """Rounds rupee amounts to whole paise as int64 (half away from zero)."""
+    rupees = np.asarray(rupees, dtype=np.float64)
+    return (np.sign(rupees) * np.floor(np.abs(rupees) * 100 + 0.5)).astype(np.int64)
+
+
+def calculate_averaging_batch_paise(current_qty, current_avg_price, market_price, target_avg_price,
+                                    buy_cost_rate=0.0, order_cost=0.0):
+    """
+    Integer-paise variant of calculate_averaging_batch. Prices are rounded to
+    whole paise and quantities to whole shares up front; after that every step
+    is exact int64 arithmetic, so share counts never depend on float rounding.
+    With charges, the per-share buy price including buy_cost_rate and the
+    per-order order_cost are each rounded to whole paise first.
+    New average is rounded half-up to the nearest paisa; estimated profit is
+    exact. Returns (shares_to_buy, new_avg, estimated_profit, valid) with
+    new_avg and estimated_profit in rupees.
+    """
+    market_price = np.asarray(market_price, dtype=np.float64)
+    qty, avg, market, target, fixed = np.broadcast_arrays(
+        np.rint(np.asarray(current_qty, dtype=np.float64)).astype(np.int64),
+        to_paise(current_avg_price),
+        to_paise(market_price * (1 + np.asarray(buy_cost_rate, dtype=np.float64))),
+        to_paise(target_avg_price),
+        to_paise(order_cost),
+    )
+    total_cost = qty * avg
+
+    numerator = qty * (target - avg) - fixed
+    denominator = market - target
+    at_market = denominator == 0
+    safe_den = np.where(at_market, 1, denominator)
+    reachable = (numerator == 0) | (np.sign(numerator) == np.sign(safe_den))
+    valid = at_market | reachable
+
+    # Exact ceil(numerator / denominator) using floor division
+    shares = np.where(at_market | ~valid, 0, -((-numerator) // safe_den))
+
+    new_total_qty = qty + shares
+    valid &= new_total_qty != 0
+    safe_qty = np.where(valid, new_total_qty, 1)
+
+    new_cost = total_cost + shares * market + np.where(shares > 0, fixed, 0)
+    new_avg_paise = (2 * new_cost + safe_qty) // (2 * safe_qty)
+    profit_paise = target * new_total_qty - new_cost
+
+    shares = np.where(valid, shares, 0)
+    new_avg = np.where(valid, new_avg_paise / 100, np.nan)
+    estimated_profit = np.where(valid, profit_paise / 100, np.nan)
+    return shares, new_avg, estimated_profit, valid
+
+
+def reconcile_paise(current_qty, current_avg_price, market_price, target_avg_price, tolerance=0.01, **charges):
+    """
+    Runs the float and paise kernels side by side. Returns a dict with the
+    row indices whose validity or share count differ, the rows whose new
+    average differs by more than `tolerance` rupees, and the largest gap.
+    """
+    f_shares, f_avg, _, f_valid = calculate_averaging_batch(
+        current_qty, current_avg_price, market_price, target_avg_price, **charges
+    )
+    p_shares, p_avg, _, p_valid = calculate_averaging_batch_paise(
+        current_qty, current_avg_price, market_price, target_avg_price, **charges
+    )
+    both = f_valid & p_valid
+    avg_gap = np.where(both, np.abs(f_avg - p_avg), 0.0)
+    return {
+        "rows": int(f_valid.size),
+        "validity_mismatch": np.flatnonzero(f_valid != p_valid),
+        "shares_mismatch": np.flatnonzero(both & (f_shares != p_shares)),
+        "avg_mismatch": np.flatnonzero(avg_gap > tolerance),
+        "max_avg_gap": float(avg_gap.max()) if avg_gap.size else 0.0,
+    }
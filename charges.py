@@ -0,0 +1,48 @@
+import numpy as np
+
+# Typical delivery-trade buy charges on NSE, as percentages of trade value unless
+# noted. Brokerage defaults to zero (most discount brokers); set brokerage_pct
+# with brokerage_cap (₹ per order) for "0.1% or ₹20, whichever is lower" plans,
+# or brokerage_flat for a fixed ₹ fee per order.
+INDIAN_EQUITY_DELIVERY = {
+    "brokerage_pct": 0.0,
+    "brokerage_cap": None,
+    "brokerage_flat": 0.0,
+    "stt_pct": 0.1,
+    "exchange_pct": 0.00297,
+    "sebi_pct": 0.0001,
+    "gst_pct": 18.0,
+    "stamp_duty_pct": 0.015,
+}
+
+
+def buy_cost_coefficients(order_value=None, model=INDIAN_EQUITY_DELIVERY):
+    """
+    Turns a charges model into (buy_cost_rate, order_cost) coefficients for
+    calculate_averaging / calculate_averaging_batch: the buy costs
+    shares * price * (1 + buy_cost_rate) + order_cost.
+
+    GST applies to brokerage, exchange and SEBI charges. When the model has a
+    brokerage_cap, pass each row's expected order_value (e.g. from a first
+    pass without charges) to decide per row whether the percentage or the
+    capped fee applies; the result is then one coefficient pair per row.
+    """
+    gst = model["gst_pct"] / 100
+    statutory = (
+        model["stt_pct"]
+        + model["stamp_duty_pct"]
+        + (model["exchange_pct"] + model["sebi_pct"]) * (1 + gst)
+    ) / 100
+    brokerage_rate = model["brokerage_pct"] / 100 * (1 + gst)
+    order_cost = model["brokerage_flat"] * (1 + gst)
+
+    cap = model["brokerage_cap"]
+    if cap is None or order_value is None:
+        return statutory + brokerage_rate, order_cost
+
+    order_value = np.asarray(order_value, dtype=np.float64)
+    capped = order_value * model["brokerage_pct"] / 100 > cap
+    return (
+        np.where(capped, statutory, statutory + brokerage_rate),
+        np.where(capped, order_cost + cap * (1 + gst), order_cost),
+    )
@@ -49,8 +49,15 @@
 
 
 
+from collections import OrderedDict
+import hashlib
+import importlib.util
+import threading
+import time
+import numpy as np
 import pandas as pd
-from fetch_price import get_live_price
+from fetch_price import get_live_prices
+from tradebook import combine_fills, holdings_from_fills, normalize_tradebook
 
 COLUMN_MAPPING = {
     "Stock Name": "Stock",
@@ -61,41 +68,411 @@ COLUMN_MAPPING = {
 
 REQUIRED_COLUMNS = ["Stock", "Current Quantity", "Current Average Price", "Current Market Price"]
 
-def load_and_validate_file(uploaded_file):
+NUMERIC_COLUMNS = ["Current Quantity", "Current Average Price", "Current Market Price"]
+
+# Hash of a row's uploaded values (before any price lookup), used to tell which
+# rows of a re-upload are unchanged from a previous snapshot
+FINGERPRINT_COLUMN = "Row Fingerprint"
+
+# pandas can read XLSX through python-calamine (Rust) when it is installed
+HAS_CALAMINE = importlib.util.find_spec("python_calamine") is not None
+
+# Changes whenever the column mapping does, so cached uploads parsed under an
+# older mapping are never reused
+MAPPING_VERSION = hashlib.sha1(repr((sorted(COLUMN_MAPPING.items()), REQUIRED_COLUMNS)).encode()).hexdigest()[:12]
+
+# Parsed uploads keyed by (content hash, mapping version, file type), shared by
+# every session in this process. Bounded by total DataFrame size (LRU eviction)
+# and by age, since blank prices in the file were filled with live quotes.
+UPLOAD_CACHE_MAX_BYTES = 256 * 1024 * 1024
+UPLOAD_CACHE_TTL = 15 * 60
+_upload_cache = OrderedDict()
+_upload_cache_bytes = 0
+_upload_cache_lock = threading.Lock()
+
+def resolve_missing_prices(df, rows=None):
+    """
+    Fills blank "Current Market Price" cells in place, limited to the boolean
+    mask `rows` when given. The distinct symbols go through one
+    get_live_prices bulk lookup and the prices are mapped back onto the rows;
+    symbols without a price stay blank for validate_batch to report.
+    """
+    if "Current Market Price" not in df.columns:
+        df["Current Market Price"] = float("nan")
+
+    missing = df["Current Market Price"].isna()
+    if rows is not None:
+        missing &= rows
+    symbols = df.loc[missing, "Stock"].dropna().unique().tolist()
+    if not symbols:
+        return df
+
+    prices, errors, _ = get_live_prices(symbols)
+    for symbol, reason in errors.items():
+        print(f"No price for {symbol}: {reason}")
+    prices = {symbol: price for symbol, price in prices.items() if price}
+
+    df.loc[missing, "Current Market Price"] = df.loc[missing, "Stock"].map(prices)
+    return df
+
+
+def row_fingerprints(df):
+    """One uint64 hash per row over the required columns, independent of the index."""
+    return pd.util.hash_pandas_object(df[REQUIRED_COLUMNS], index=False).to_numpy()
+
+
+def diff_portfolios(df, previous):
+    """
+    Classifies each row of df against a previous portfolio by fingerprint and
+    symbol. Returns boolean masks over df's rows (unchanged, changed, added)
+    and the list of symbols that are no longer held (removed).
+    """
+    unchanged = df[FINGERPRINT_COLUMN].isin(previous[FINGERPRINT_COLUMN]).to_numpy()
+    known = df["Stock"].isin(previous["Stock"]).to_numpy()
+    return {
+        "unchanged": unchanged,
+        "changed": known & ~unchanged,
+        "added": ~known,
+        "removed": sorted(set(previous["Stock"].dropna()) - set(df["Stock"].dropna())),
+    }
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+def read_excel_openpyxl_values(source):
+    """First sheet via openpyxl read-only mode, building rows from plain values."""
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
     try:
-        if uploaded_file.name.endswith(".csv"):
-            df = pd.read_csv(uploaded_file)
-        elif uploaded_file.name.endswith(".xlsx"):
-            df = pd.read_excel(uploaded_file)
-        else:
-            return None, "Unsupported file type."
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(c).strip() if c is not None else f"Unnamed: {i}" for i, c in enumerate(next(rows, ()))]
+        return pd.DataFrame([row[:len(header)] for row in rows], columns=header)
+    finally:
+        workbook.close()
 
-        df.rename(columns=COLUMN_MAPPING, inplace=True)
 
-        for idx, row in df.iterrows():
-            if pd.isna(row.get("Current Market Price", None)):
-                live_price = get_live_price(row["Stock"])
-                if live_price:
-                    df.at[idx, "Current Market Price"] = live_price
+def read_excel_fast(source):
+    """
+    Reads the first sheet of an XLSX broker export with the fastest backend
+    available: calamine if installed, then openpyxl read-only values, and
+    plain pd.read_excel as the last resort.
+    """
+    if HAS_CALAMINE:
+        try:
+            return pd.read_excel(source, engine="calamine")
+        except Exception as e:
+            print(f"calamine could not read workbook, falling back: {e}")
+            _rewind(source)
+    try:
+        return read_excel_openpyxl_values(source)
+    except Exception as e:
+        print(f"openpyxl read-only could not read workbook, falling back: {e}")
+        _rewind(source)
+    return pd.read_excel(source)
 
-        missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
-        if missing_cols:
-            return None, f"Missing required columns: {', '.join(missing_cols)}"
 
-        df.dropna(subset=REQUIRED_COLUMNS, inplace=True)
+def _read_upload(uploaded_file):
+    if uploaded_file.name.endswith(".csv"):
+        return pd.read_csv(uploaded_file), None
+    if uploaded_file.name.endswith(".xlsx"):
+        return read_excel_fast(uploaded_file), None
+    return None, "Unsupported file type."
+
+
+def _read_holdings(uploaded_files, cost_method=None):
+    """
+    Reads uploads into one holdings frame in the REQUIRED_COLUMNS layout.
+    Holdings files are concatenated as they are. Broker tradebooks (when
+    cost_method is set) are combined into a single fill history first, so a
+    position bought in one export and sold in another (e.g. per-FY files)
+    nets out correctly.
+    """
+    frames = []
+    for uploaded_file in uploaded_files:
+        df, error = _read_upload(uploaded_file)
+        if error is None and cost_method:
+            try:
+                df = normalize_tradebook(df)
+            except ValueError as e:
+                error = str(e)
+        if error:
+            return None, f"{uploaded_file.name}: {error}" if len(uploaded_files) > 1 else error
+        frames.append(df)
+
+    if cost_method:
+        try:
+            return _as_holdings(holdings_from_fills(combine_fills(frames), cost_method))
+        except ValueError as e:
+            return None, str(e)
+
+    holdings = []
+    for uploaded_file, df in zip(uploaded_files, frames):
+        df, error = _as_holdings(df)
+        if error:
+            return None, f"{uploaded_file.name}: {error}" if len(uploaded_files) > 1 else error
+        holdings.append(df)
+    return pd.concat(holdings, ignore_index=True) if len(holdings) > 1 else holdings[0], None
+
+
+def _as_holdings(df):
+    df.rename(columns=COLUMN_MAPPING, inplace=True)
+
+    if "Stock" in df.columns and "Current Market Price" not in df.columns:
+        df["Current Market Price"] = float("nan")
 
-        for col in ["Current Quantity", "Current Average Price", "Current Market Price"]:
-            df[col] = pd.to_numeric(df[col], errors="coerce")
+    missing_cols = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+    if missing_cols:
+        return None, f"Missing required columns: {', '.join(missing_cols)}"
 
-        return df, None
+    # Invalid rows are kept so validate_batch can report why they are rejected
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors="coerce")
+    return df, None
+
+
+def _price_portfolio(df, previous=None):
+    df[FINGERPRINT_COLUMN] = row_fingerprints(df)
+
+    if previous is not None and FINGERPRINT_COLUMN in previous.columns:
+        known_prices = previous.drop_duplicates(FINGERPRINT_COLUMN).set_index(FINGERPRINT_COLUMN)["Current Market Price"]
+        blank = df["Current Market Price"].isna()
+        df.loc[blank, "Current Market Price"] = df.loc[blank, FINGERPRINT_COLUMN].map(known_prices)
+    return resolve_missing_prices(df)
+
+
+def consolidate_holdings(df, quantity="Current Quantity", average="Current Average Price", sums=()):
+    """
+    Merges rows of the same Stock (e.g. one symbol held in several demat
+    accounts) into one: quantities and any `sums` columns are added up and the
+    average price becomes the quantity-weighted mean. Other columns keep their
+    first non-blank value. Rows without a usable symbol, quantity or average
+    are passed through untouched so validation can still report them.
+    """
+    mergeable = df["Stock"].notna() & (df[quantity] > 0) & (df[average] >= 0)
+    rows = df[mergeable]
+    if not rows["Stock"].duplicated().any():
+        return df
+
+    grouped = rows.assign(_cost=rows[quantity] * rows[average]).groupby("Stock", sort=False)
+    merged = grouped.first()
+    totals = grouped[[quantity, "_cost", *sums]].sum()
+    merged[[quantity, *sums]] = totals[[quantity, *sums]]
+    merged[average] = totals["_cost"] / totals[quantity]
+    merged = merged.drop(columns="_cost").reset_index()
+    return pd.concat([merged, df[~mergeable]], ignore_index=True)[list(df.columns)]
+
+
+def load_and_validate_file(uploaded_file, previous=None, cost_method=None):
+    """
+    Reads and validates an uploaded portfolio. When `previous` (a snapshot's
+    portfolio with a FINGERPRINT_COLUMN) is given, blank prices on rows that
+    are unchanged since then are taken from it, so only changed or new rows
+    go to the network. With a cost_method ("weighted" or "fifo") the file is
+    read as a broker tradebook instead of holdings.
+    """
+    try:
+        df, error = _read_holdings([uploaded_file], cost_method)
+        if error:
+            return None, error
+        return _price_portfolio(df, previous), None
 
     except Exception as e:
         return None, f"Error processing file: {e}"
 
 
+def load_and_validate_files(uploaded_files, previous=None, cost_method=None):
+    """
+    Like load_and_validate_file for several files at once (e.g. one export per
+    demat account, or one tradebook per financial year). The files are
+    combined by _read_holdings and duplicate symbols merged with
+    consolidate_holdings before any price is fetched.
+    """
+    try:
+        df, error = _read_holdings(list(uploaded_files), cost_method)
+        if error:
+            return None, error
+        return _price_portfolio(consolidate_holdings(df), previous), None
+
+    except Exception as e:
+        return None, f"Error processing file: {e}"
+
+
+def _read_xlsx_chunks(source, wanted, chunksize):
+    from openpyxl import load_workbook
+
+    workbook = load_workbook(source, read_only=True, data_only=True)
+    try:
+        rows = workbook.active.iter_rows(values_only=True)
+        header = [str(c).strip() if c is not None else "" for c in next(rows, ())]
+        keep = [i for i, name in enumerate(header) if name in wanted]
+        names = [header[i] for i in keep]
+
+        batch = []
+        for row in rows:
+            batch.append([row[i] if i < len(row) else None for i in keep])
+            if len(batch) >= chunksize:
+                yield pd.DataFrame(batch, columns=names)
+                batch = []
+        if batch:
+            yield pd.DataFrame(batch, columns=names)
+    finally:
+        workbook.close()
+
+
+def iter_validated_chunks(source, chunksize=200_000, fetch_missing=True):
+    """
+    Streams a CSV/XLSX portfolio in chunks of `chunksize` rows, reading only
+    the mapped/required columns, as text. Each chunk is renamed via
+    COLUMN_MAPPING and coerced, has blank prices resolved and invalid rows
+    dropped, so a malformed cell (e.g. "1,500.50") rejects its row rather than
+    the whole file. Yields (chunk, rows_dropped). Raises ValueError on bad
+    input.
+    """
+    name = str(getattr(source, "name", source))
+    wanted = set(COLUMN_MAPPING) | set(REQUIRED_COLUMNS)
+
+    if name.endswith(".csv"):
+        reader = pd.read_csv(source, usecols=lambda col: col in wanted, dtype="string", chunksize=chunksize)
+    elif name.endswith(".xlsx"):
+        reader = _read_xlsx_chunks(source, wanted, chunksize)
+    else:
+        raise ValueError("Unsupported file type.")
+
+    for chunk in reader:
+        chunk = chunk.rename(columns=COLUMN_MAPPING)
+        missing_cols = [col for col in REQUIRED_COLUMNS[:3] if col not in chunk.columns]
+        if missing_cols:
+            raise ValueError(f"Missing required columns: {', '.join(missing_cols)}")
+
+        if "Current Market Price" not in chunk.columns:
+            chunk["Current Market Price"] = float("nan")
+        # Only genuinely blank market prices are looked up; cells that are filled
+        # in but not numbers stay NaN and are rejected by validate_batch below
+        blank_price = chunk["Current Market Price"].isna() | chunk["Current Market Price"].astype("string").str.strip().eq("")
+        for col in NUMERIC_COLUMNS:
+            chunk[col] = pd.to_numeric(chunk[col].astype(object), errors="coerce").astype("float64")
+        if fetch_missing:
+            resolve_missing_prices(chunk, rows=blank_price.to_numpy(dtype=bool))
+
+        valid, _ = validate_batch(chunk)
+        yield chunk[valid], int(len(valid) - valid.sum())
+
+
+def load_and_validate_files_cached(uploaded_files, previous=None, cost_method=None, previous_id=None):
+    """
+    Same as load_and_validate_files, but reuses the parsed DataFrame when the
+    exact same files were uploaded recently against the same baseline.
+    `previous_id` identifies the `previous` snapshot (e.g. owner and name);
+    without one, the baseline's fingerprints and prices are hashed instead.
+    Returns a copy so callers can modify it freely.
+    """
+    global _upload_cache_bytes
+
+    digest = hashlib.sha256()
+    for uploaded_file in uploaded_files:
+        digest.update(hashlib.sha256(uploaded_file.getvalue()).digest())
+        digest.update(uploaded_file.name.rsplit(".", 1)[-1].encode())
+    if previous is not None and previous_id is None:
+        previous_id = hashlib.sha256(
+            pd.util.hash_pandas_object(
+                previous[[FINGERPRINT_COLUMN, "Current Market Price"]], index=False
+            ).to_numpy().tobytes()
+        ).hexdigest()
+    key = (digest.hexdigest(), MAPPING_VERSION, cost_method, previous_id if previous is not None else None)
+
+    with _upload_cache_lock:
+        entry = _upload_cache.get(key)
+        if entry is not None:
+            if time.monotonic() - entry[0] < UPLOAD_CACHE_TTL:
+                _upload_cache.move_to_end(key)
+                return entry[1].copy(), None
+            _upload_cache_bytes -= entry[2]
+            del _upload_cache[key]
+
+    df, error = load_and_validate_files(uploaded_files, previous, cost_method)
+    if error is not None or df is None:
+        return df, error
+
+    size = int(df.memory_usage(deep=True).sum())
+    if size <= UPLOAD_CACHE_MAX_BYTES:
+        with _upload_cache_lock:
+            if key in _upload_cache:
+                _upload_cache_bytes -= _upload_cache.pop(key)[2]
+            _upload_cache[key] = (time.monotonic(), df.copy(), size)
+            _upload_cache_bytes += size
+            while _upload_cache_bytes > UPLOAD_CACHE_MAX_BYTES:
+                _, (_, _, evicted) = _upload_cache.popitem(last=False)
+                _upload_cache_bytes -= evicted
+    return df, None
+
+
 def validate_inputs(current_qty, current_avg_price, market_price, target_avg_price):
     if current_qty <= 0:
         return False, "Current quantity must be greater than 0."
     if current_avg_price < 0 or market_price <= 0 or target_avg_price <= 0:
         return False, "Prices must be greater than 0."
-    return True, None
\ No newline at end of file
+    return True, None
+
+
+# Batch validation: one bit per rule so a row can report every problem at once.
+# Messages follow validate_inputs.
+VALIDATION_ERRORS = {
+    1: "Stock name is missing.",
+    2: "Current quantity is missing or not a number.",
+    4: "Current quantity must be greater than 0.",
+    8: "Current average price is missing or not a number.",
+    16: "Current average price must not be negative.",
+    32: "Market price is missing or not a number.",
+    64: "Market price must be greater than 0.",
+    128: "Target average price must be greater than 0.",
+}
+
+
+def validate_batch(df, target_avg_price=None):
+    """
+    Column-wise counterpart of validate_inputs. Checks every rule for every
+    row in one vectorized pass and returns (valid_mask, error_codes), where
+    error_codes is a uint16 bitmask of VALIDATION_ERRORS keys (0 = valid).
+    """
+    codes = np.zeros(len(df), dtype=np.uint16)
+
+    if "Stock" in df.columns:
+        blank_stock = (df["Stock"].isna() | df["Stock"].eq("")).to_numpy(dtype=bool)
+    else:
+        blank_stock = np.ones(len(df), dtype=bool)
+    codes |= np.where(blank_stock, 1, 0).astype(np.uint16)
+
+    numeric_rules = [
+        ("Current Quantity", 2, 4, lambda v: v <= 0),
+        ("Current Average Price", 8, 16, lambda v: v < 0),
+        ("Current Market Price", 32, 64, lambda v: v <= 0),
+    ]
+    for col, missing_code, bad_code, is_bad in numeric_rules:
+        if col in df.columns:
+            values = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=np.float64)
+        else:
+            values = np.full(len(df), np.nan)
+        missing = np.isnan(values)
+        codes |= np.where(missing, missing_code, 0).astype(np.uint16)
+        with np.errstate(invalid="ignore"):
+            codes |= np.where(~missing & is_bad(values), bad_code, 0).astype(np.uint16)
+
+    if target_avg_price is not None:
+        target = np.broadcast_to(np.asarray(target_avg_price, dtype=np.float64), codes.shape)
+        codes |= np.where(~(target > 0), 128, 0).astype(np.uint16)
+
+    return codes == 0, codes
+
+
+def summarize_rejections(error_codes):
+    """Number of rejected rows per reason (a row can count under several reasons)."""
+    error_codes = np.asarray(error_codes)
+    counts = {message: int(np.count_nonzero(error_codes & code)) for code, message in VALIDATION_ERRORS.items()}
+    return pd.DataFrame(
+        [(message, rows) for message, rows in counts.items() if rows],
+        columns=["Reason", "Rows"]
+    )
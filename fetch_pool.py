@@ -0,0 +1,94 @@
+from contextlib import contextmanager
+import threading
+import time
+import numpy as np
+
+# Per-provider request budgets: sustained requests/second, burst size and how
+# many requests may be in flight at once. Shared by every thread and session
+# in the process, so concurrent users do not add up to a throttling ban.
+PROVIDER_LIMITS = {
+    "yfinance": {"rate": 4.0, "burst": 8, "max_in_flight": 8},
+    "nsetools": {"rate": 2.0, "burst": 4, "max_in_flight": 4},
+    "nsepython": {"rate": 2.0, "burst": 4, "max_in_flight": 4},
+}
+SLOT_TIMEOUT = 30.0
+
+_limiters = {}
+_limiters_lock = threading.Lock()
+
+
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def take(self, timeout=None, cancelled=None):
+        """
+        Waits for one token; False if none is available within timeout seconds
+        or the `cancelled` event is set while waiting.
+        """
+        end = None if timeout is None else time.monotonic() + timeout
+        while True:
+            if cancelled is not None and cancelled.is_set():
+                return False
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return True
+                delay = (1 - self.tokens) / self.rate
+            if end is not None and now + delay > end:
+                return False
+            if cancelled is not None:
+                cancelled.wait(delay)
+            else:
+                time.sleep(delay)
+
+
+class ProviderLimiter:
+    def __init__(self, rate, burst, max_in_flight):
+        self.bucket = TokenBucket(rate, burst)
+        self.in_flight = threading.BoundedSemaphore(max_in_flight)
+
+    @contextmanager
+    def slot(self, timeout=SLOT_TIMEOUT, cancelled=None):
+        """
+        Holds one in-flight slot and one rate token for the duration of a request.
+        A request whose `cancelled` event is set before it gets both gives up
+        without spending a token.
+        """
+        if cancelled is not None and cancelled.is_set():
+            raise TimeoutError("cancelled")
+        start = time.monotonic()
+        if not self.in_flight.acquire(timeout=timeout):
+            raise TimeoutError("too many requests in flight")
+        try:
+            remaining = None if timeout is None else max(0.0, timeout - (time.monotonic() - start))
+            if not self.bucket.take(remaining, cancelled):
+                raise TimeoutError("cancelled" if cancelled is not None and cancelled.is_set() else "rate limit")
+            yield
+        finally:
+            self.in_flight.release()
+
+
+def limiter(provider):
+    """The process-wide ProviderLimiter for a provider named in PROVIDER_LIMITS."""
+    with _limiters_lock:
+        if provider not in _limiters:
+            _limiters[provider] = ProviderLimiter(**PROVIDER_LIMITS[provider])
+        return _limiters[provider]
+
+
+def latency_summary(latencies):
+    """Count and p50/p90/p99/max of per-call latencies, in milliseconds."""
+    if not latencies:
+        return {"calls": 0, "p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    ms = np.asarray(latencies) * 1000
+    p50, p90, p99 = np.percentile(ms, [50, 90, 99])
+    return {"calls": len(ms), "p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99), "max_ms": float(ms.max())}
+
@@ -44,27 +44,148 @@
 #     except Exception as e:
 #         print(f"Error fetching live price for {stock_name}: {e}")
 #         return None
-import yfinance as yf
-from nsetools import Nse
+from collections import OrderedDict
+import datetime
+import threading
+import time
+from quote_store import read_quote, read_quotes, write_quote, write_quotes
+from market_data import fetch_quote, fetch_quotes
+from fetch_pool import latency_summary
 
-nse = Nse()
+# Quotes are cached per symbol for a short time during NSE trading hours and
+# much longer once the market is closed (the price cannot move then). Each
+# process keeps an in-memory LRU in front of the shared on-disk quote store.
+QUOTE_TTL_MARKET_HOURS = 15
+QUOTE_TTL_AFTER_CLOSE = 30 * 60
+QUOTE_CACHE_MAX_SIZE = 2048
+MARKET_OPEN = datetime.time(9, 15)
+MARKET_CLOSE = datetime.time(15, 30)
+IST = datetime.timezone(datetime.timedelta(hours=5, minutes=30))
 
-def get_live_price(stock_name):
+_quote_cache = OrderedDict()
+_quote_cache_lock = threading.Lock()
+_quote_cache_stats = {"hits": 0, "store_hits": 0, "misses": 0}
+
+
+def quote_ttl(now=None):
+    """Seconds a cached quote stays fresh at `now` (defaults to the current IST time)."""
+    now = now or datetime.datetime.now(IST)
+    trading = now.weekday() < 5 and MARKET_OPEN <= now.time() <= MARKET_CLOSE
+    return QUOTE_TTL_MARKET_HOURS if trading else QUOTE_TTL_AFTER_CLOSE
+
+
+def quote_cache_info():
+    with _quote_cache_lock:
+        return {**_quote_cache_stats, "size": len(_quote_cache), "max_size": QUOTE_CACHE_MAX_SIZE}
+
+
+def clear_quote_cache():
+    with _quote_cache_lock:
+        _quote_cache.clear()
+        _quote_cache_stats.update(hits=0, store_hits=0, misses=0)
+
+
+def _cached_quote(stock_code):
+    with _quote_cache_lock:
+        entry = _quote_cache.get(stock_code)
+        if entry is not None and time.monotonic() - entry[0] < quote_ttl():
+            _quote_cache.move_to_end(stock_code)
+            _quote_cache_stats["hits"] += 1
+            return entry[1]
+        return None
+
+
+def _store_quote(stock_code, price, age=0.0):
+    with _quote_cache_lock:
+        _quote_cache[stock_code] = (time.monotonic() - age, price)
+        _quote_cache.move_to_end(stock_code)
+        while len(_quote_cache) > QUOTE_CACHE_MAX_SIZE:
+            _quote_cache.popitem(last=False)
+
+
+def get_live_price(stock_name, bypass_cache=False):
+    """
+    Latest price for an NSE symbol, or None. Served from the in-process quote
+    cache, then the shared quote store, when a fresh enough quote is there;
+    bypass_cache=True always goes to the network (and refreshes both).
+    """
     try:
         if not isinstance(stock_name, str) or not stock_name.strip():
             return None
         stock_code = stock_name.strip().upper()
-        # Try yfinance first
-        try:
-            ticker = yf.Ticker(stock_code + ".NS")
-            price = ticker.info.get('regularMarketPrice')
+        if not bypass_cache:
+            price = _cached_quote(stock_code)
             if price is not None:
                 return price
-        except Exception as yf_exc:
-            print(f"yfinance error for {stock_code}: {yf_exc}")
-        # Fallback to nsetools
-        stock_data = nse.get_quote(stock_code)
-        return stock_data['lastPrice']
+            stored = read_quote(stock_code, quote_ttl())
+            if stored is not None:
+                price, _, fetched_at = stored
+                _store_quote(stock_code, price, age=max(0.0, time.time() - fetched_at))
+                with _quote_cache_lock:
+                    _quote_cache_stats["store_hits"] += 1
+                return price
+            with _quote_cache_lock:
+                _quote_cache_stats["misses"] += 1
+        price, source = fetch_quote(stock_code)
+        if price is not None:
+            _store_quote(stock_code, price)
+            write_quote(stock_code, price, source)
+        return price
     except Exception as e:
         print(f"Error fetching price for {stock_name}: {e}")
         return None
+
+
+def get_live_prices(symbols, bypass_cache=False):
+    """
+    Bulk version of get_live_price. Symbols are normalised and deduplicated,
+    fresh quotes come from the caches, and the rest are fetched through the
+    market_data providers' bulk paths (a yfinance multi-ticker download per
+    chunk, then NSE's index quote pages or single quotes for what is left).
+
+    Returns (prices, errors, latency): {symbol: price} and {symbol: reason},
+    keyed by the symbols exactly as given, and the latency_summary of the
+    provider requests made (no calls when everything was cached).
+    """
+    codes, errors = {}, {}
+    for symbol in symbols:
+        if isinstance(symbol, str) and symbol.strip():
+            codes.setdefault(symbol, symbol.strip().upper())
+        else:
+            errors[symbol] = "Invalid symbol"
+    unique = list(dict.fromkeys(codes.values()))
+
+    found = {}
+    if not bypass_cache:
+        for code in unique:
+            price = _cached_quote(code)
+            if price is not None:
+                found[code] = price
+        stored = read_quotes([code for code in unique if code not in found], quote_ttl())
+        now = time.time()
+        for code, (price, _, fetched_at) in stored.items():
+            _store_quote(code, price, age=max(0.0, now - fetched_at))
+            found[code] = price
+        with _quote_cache_lock:
+            _quote_cache_stats["store_hits"] += len(stored)
+            _quote_cache_stats["misses"] += len(unique) - len(found)
+
+    missing = [code for code in unique if code not in found]
+    reasons, latency = {}, latency_summary([])
+    if missing:
+        fetched, reasons, latency = fetch_quotes(missing)
+        by_source = {}
+        for code, (price, source) in fetched.items():
+            _store_quote(code, price)
+            by_source.setdefault(source, {})[code] = price
+            found[code] = price
+        for source, quotes in by_source.items():
+            write_quotes(quotes, source)
+
+    prices = {}
+    for symbol, code in codes.items():
+        if code in found:
+            prices[symbol] = found[code]
+        else:
+            errors[symbol] = reasons.get(code, "No price found")
+    return prices, errors, latency
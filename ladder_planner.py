@@ -0,0 +1,64 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+from calculations import plan_buy_ladder
+
+
+def ladder_planner_ui(current_qty, current_avg_price, market_price, target_avg_price):
+    with st.expander("🪜 Plan a Staged Buy Ladder", expanded=False):
+        col1, col2 = st.columns(2)
+        with col1:
+            rungs = st.number_input(
+                "Number of buys",
+                min_value=1,
+                max_value=20,
+                value=3,
+                help="How many staged purchases to split the averaging into"
+            )
+        with col2:
+            step_pct = st.number_input(
+                "Price drop between buys (%)",
+                min_value=0.5,
+                max_value=50.0,
+                value=5.0,
+                step=0.5,
+                help="Each buy is placed this much below the previous one"
+            )
+
+        prices, shares, cum_qty, running_avg, cum_capital, valid = plan_buy_ladder(
+            current_qty, current_avg_price, market_price, target_avg_price, rungs, step_pct
+        )
+        if not valid[0]:
+            st.markdown("""
+                <div class='error-message'>
+                    ❌ Target average is not reachable with this ladder.
+                </div>
+            """, unsafe_allow_html=True)
+            return
+
+        ladder_df = pd.DataFrame({
+            "Buy #": np.arange(1, int(rungs) + 1),
+            "Buy Price (₹)": np.round(prices[0], 2),
+            "Shares to Buy": shares[0],
+            "Cumulative Quantity": cum_qty[0],
+            "Running Average (₹)": np.round(running_avg[0], 2),
+            "Capital Needed (₹)": np.round(cum_capital[0], 2),
+        })
+        st.dataframe(ladder_df, hide_index=True)
+
+        # Sweep of ladder shapes: total capital for every buys × drop combination
+        sweep_rungs = np.arange(1, 11)
+        sweep_steps = np.arange(1, 11) * 1.0
+        grid_rungs, grid_steps = np.meshgrid(sweep_rungs, sweep_steps, indexing="ij")
+        _, _, _, _, sweep_capital, sweep_valid = plan_buy_ladder(
+            current_qty, current_avg_price, market_price, target_avg_price,
+            grid_rungs.ravel(), grid_steps.ravel()
+        )
+        total_capital = np.where(sweep_valid, sweep_capital[:, -1], np.nan)
+        sweep_df = pd.DataFrame(
+            np.round(total_capital.reshape(grid_rungs.shape), 2),
+            index=pd.Index(sweep_rungs, name="Buys"),
+            columns=[f"{s:g}% drop" for s in sweep_steps],
+        )
+        st.markdown("**Total capital needed by ladder shape (₹)**")
+        st.dataframe(sweep_df)
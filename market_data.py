@@ -0,0 +1,393 @@
+import asyncio
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+import contextvars
+import datetime
+import importlib.util
+import json
+import math
+import os
+import threading
+import pandas as pd
+from fetch_pool import latency_summary, limiter
+
+# Async market-data layer behind fetch_price and risk_analyzer. Every source is
+# a MarketDataProvider; a MarketDataClient tries its providers in order, with a
+# per-request timeout, and run_sync() lets synchronous Streamlit code call it.
+# Providers may leave out capabilities they lack (NotImplementedError) and the
+# client moves on to the next one.
+PROVIDERS = {}
+DEFAULT_PROVIDERS = os.environ.get("EQUISMART_MARKET_PROVIDERS", "yfinance,nsetools,nsepython")
+FIXTURE_PATH = os.environ.get("EQUISMART_MARKET_FIXTURES")
+# Seconds a request may take once it holds its provider's limiter slot; time
+# spent queued behind the rate limit does not count
+REQUEST_TIMEOUT = 10.0
+# Overall time allowed for the one-quote-per-symbol fallback
+NSE_FETCH_DEADLINE = 30.0
+
+YF_CHUNK_SIZE = 100
+NSE_BATCH_INDICES = ("NIFTY 500",)
+NSE_BATCH_MIN_SYMBOLS = 5
+
+HAS_NSEPYTHON = importlib.util.find_spec("nsepython") is not None
+
+# Blocking client libraries run here; a shared pool (rather than each event
+# loop's default executor) means a request that timed out never holds up
+# run_sync's return while its thread finishes.
+_EXECUTOR = ThreadPoolExecutor(max_workers=32, thread_name_prefix="market-data")
+
+_default_client = None
+_default_client_lock = threading.Lock()
+
+# Set by timed_batch: every admitted _blocking call in the batch appends its
+# latency (admission to completion or timeout) here
+_latencies = contextvars.ContextVar("market_data_latencies", default=None)
+
+
+def register_provider(name):
+    def decorator(cls):
+        cls.name = name
+        PROVIDERS[name] = cls
+        return cls
+    return decorator
+
+
+async def _blocking(provider, func, *args, timeout=REQUEST_TIMEOUT):
+    """
+    Runs a blocking call on the shared pool inside the provider's rate limits.
+    `timeout` starts once the call holds its limiter slot, so a large batch
+    queued behind the rate limit does not time out while waiting its turn. A
+    call abandoned (timed out or cancelled) before it got a slot never runs.
+    Latency is recorded for timed_batch from admission on.
+    """
+    loop = asyncio.get_running_loop()
+    admitted = loop.create_future()
+    abandoned = threading.Event()
+
+    def admit():
+        if not admitted.done():
+            admitted.set_result(None)
+
+    def limited():
+        with limiter(provider).slot(cancelled=abandoned):
+            loop.call_soon_threadsafe(admit)
+            return func(*args)
+
+    work = loop.run_in_executor(_EXECUTOR, limited)
+    started = None
+    try:
+        await asyncio.wait({admitted, work}, return_when=asyncio.FIRST_COMPLETED)
+        started = loop.time()
+        return await asyncio.wait_for(work, timeout)
+    finally:
+        latencies = _latencies.get()
+        if latencies is not None and started is not None:
+            latencies.append(loop.time() - started)
+        # Drops the call if it is still queued on the pool or the limiter
+        abandoned.set()
+        admitted.cancel()
+        work.cancel()
+
+
+async def gather_within(coros, deadline=None):
+    """
+    Runs coroutines concurrently and returns their results in order, with
+    exceptions in place of failed results. Those still running after
+    `deadline` seconds are cancelled and come back as TimeoutError.
+    """
+    tasks = [asyncio.ensure_future(coro) for coro in coros]
+    if not tasks:
+        return []
+    try:
+        _, pending = await asyncio.wait(tasks, timeout=deadline)
+    finally:
+        for task in tasks:
+            task.cancel()
+    await asyncio.gather(*pending, return_exceptions=True)
+    return [
+        TimeoutError("deadline exceeded") if task in pending
+        else task.exception() or task.result()
+        for task in tasks
+    ]
+
+
+def _describe(error):
+    return f"{type(error).__name__}: {error}" if str(error) else type(error).__name__
+
+
+class MarketDataProvider:
+    """
+    `timeout` is the per-request limit, passed on to _blocking so that it
+    starts once the request is admitted by the provider's rate limiter.
+    """
+    name = "base"
+
+    async def quote(self, symbol, timeout=REQUEST_TIMEOUT):
+        """Latest price for an NSE symbol (e.g. "INFY"), or None."""
+        raise NotImplementedError
+
+    async def fundamentals(self, symbol, timeout=REQUEST_TIMEOUT):
+        """Dict of fundamentals using Yahoo's info keys (trailingPE, returnOnEquity, ...)."""
+        raise NotImplementedError
+
+    async def history(self, symbol, days, timeout=REQUEST_TIMEOUT):
+        """pd.Series of daily closes over the last `days` calendar days."""
+        raise NotImplementedError
+
+    async def quotes(self, symbols, timeout=REQUEST_TIMEOUT, deadline=None):
+        """
+        Prices for many symbols as ({symbol: price}, {symbol: reason}). By
+        default every quote() is submitted at once and the rate limiter paces
+        them; quotes still outstanding after `deadline` seconds are given up.
+        Providers with a bulk endpoint override this.
+        """
+        results = await gather_within((self.quote(symbol, timeout) for symbol in symbols), deadline)
+        prices, errors = {}, {}
+        for symbol, result in zip(symbols, results):
+            if isinstance(result, NotImplementedError):
+                raise result
+            if isinstance(result, BaseException):
+                errors[symbol] = f"{self.name}: {_describe(result)}"
+            elif result is None or pd.isna(result):
+                errors[symbol] = f"{self.name}: no price"
+            else:
+                prices[symbol] = float(result)
+        return prices, errors
+
+
+@register_provider("yfinance")
+class YFinanceProvider(MarketDataProvider):
+    async def quote(self, symbol, timeout=REQUEST_TIMEOUT):
+        info = await self.fundamentals(symbol, timeout)
+        return info.get("regularMarketPrice")
+
+    async def fundamentals(self, symbol, timeout=REQUEST_TIMEOUT):
+        import yfinance as yf
+        return await _blocking(self.name, lambda: yf.Ticker(symbol + ".NS").info, timeout=timeout)
+
+    async def history(self, symbol, days, timeout=REQUEST_TIMEOUT):
+        import yfinance as yf
+        end = datetime.datetime.today()
+        start = end - datetime.timedelta(days=days)
+        return await _blocking(
+            self.name, lambda: yf.Ticker(symbol + ".NS").history(start=start, end=end)["Close"], timeout=timeout
+        )
+
+    async def quotes(self, symbols, timeout=REQUEST_TIMEOUT, deadline=None):
+        # One multi-ticker download per chunk; the last of 5 daily closes is the latest price
+        import yfinance as yf
+
+        def download(tickers):
+            closes = yf.download(tickers, period="5d", interval="1d", auto_adjust=False, progress=False)["Close"]
+            if isinstance(closes, pd.Series):
+                closes = closes.to_frame(tickers[0])
+            return closes.ffill().iloc[-1] if len(closes) else pd.Series(dtype=float)
+
+        chunks = [symbols[i:i + YF_CHUNK_SIZE] for i in range(0, len(symbols), YF_CHUNK_SIZE)]
+        results = await gather_within(
+            (_blocking(self.name, download, [s + ".NS" for s in chunk], timeout=timeout) for chunk in chunks),
+            deadline
+        )
+        prices, errors = {}, {}
+        for chunk, last in zip(chunks, results):
+            if isinstance(last, BaseException):
+                errors.update((symbol, f"{self.name}: {_describe(last)}") for symbol in chunk)
+                continue
+            for symbol in chunk:
+                price = last.get(symbol + ".NS")
+                if price is not None and not pd.isna(price):
+                    prices[symbol] = float(price)
+                else:
+                    errors[symbol] = f"{self.name}: no recent close"
+        return prices, errors
+
+
+@register_provider("nsetools")
+class NseToolsProvider(MarketDataProvider):
+    def __init__(self):
+        self._nse = None
+        self._lock = threading.Lock()
+
+    @property
+    def nse(self):
+        with self._lock:
+            if self._nse is None:
+                from nsetools import Nse
+                self._nse = Nse()
+            return self._nse
+
+    async def quote(self, symbol, timeout=REQUEST_TIMEOUT):
+        return await _blocking(self.name, lambda: self.nse.get_quote(symbol)["lastPrice"], timeout=timeout)
+
+    async def quotes(self, symbols, timeout=REQUEST_TIMEOUT, deadline=NSE_FETCH_DEADLINE):
+        # An index quote page prices hundreds of symbols in one request; whatever
+        # it does not cover falls back to single quotes
+        prices, errors = {}, {}
+        wanted = set(symbols)
+        if len(wanted) >= NSE_BATCH_MIN_SYMBOLS:
+            for index in NSE_BATCH_INDICES:
+                try:
+                    records = await _blocking(self.name, self.nse.get_stock_quote_in_index, index, timeout=timeout)
+                except Exception as e:
+                    print(f"nsetools error for index {index}: {_describe(e)}")
+                    continue
+                for record in records:
+                    symbol = record.get("symbol")
+                    if symbol in wanted and record.get("lastPrice") is not None:
+                        prices[symbol] = float(record["lastPrice"])
+                        wanted.discard(symbol)
+                if not wanted:
+                    break
+        if wanted:
+            single, errors = await super().quotes(sorted(wanted), timeout, deadline)
+            prices.update(single)
+        return prices, errors
+
+
+@register_provider("nsepython")
+class NsePythonProvider(MarketDataProvider):
+    async def quote(self, symbol, timeout=REQUEST_TIMEOUT):
+        if not HAS_NSEPYTHON:
+            raise NotImplementedError
+        from nsepython import nse_quote_ltp
+        return await _blocking(self.name, nse_quote_ltp, symbol, timeout=timeout)
+
+    async def quotes(self, symbols, timeout=REQUEST_TIMEOUT, deadline=NSE_FETCH_DEADLINE):
+        return await super().quotes(symbols, timeout, deadline)
+
+
+@register_provider("fixture")
+class FixtureProvider(MarketDataProvider):
+    """
+    Offline provider for tests and demos. Data is passed in directly or read
+    from a JSON file ({"quotes": {...}, "fundamentals": {...}, "history":
+    {symbol: [closes]}}), by default EQUISMART_MARKET_FIXTURES.
+    """
+
+    def __init__(self, quotes=None, fundamentals=None, history=None, path=FIXTURE_PATH):
+        data = {}
+        if path:
+            with open(path) as f:
+                data = json.load(f)
+        self._quotes = {**data.get("quotes", {}), **(quotes or {})}
+        self._fundamentals = {**data.get("fundamentals", {}), **(fundamentals or {})}
+        self._history = {**data.get("history", {}), **(history or {})}
+
+    async def quote(self, symbol, timeout=REQUEST_TIMEOUT):
+        return self._quotes.get(symbol)
+
+    async def fundamentals(self, symbol, timeout=REQUEST_TIMEOUT):
+        if symbol not in self._fundamentals:
+            raise KeyError(symbol)
+        return dict(self._fundamentals[symbol])
+
+    async def history(self, symbol, days, timeout=REQUEST_TIMEOUT):
+        if symbol not in self._history:
+            raise KeyError(symbol)
+        return pd.Series(self._history[symbol], dtype=float)
+
+
+class MarketDataClient:
+    def __init__(self, providers, timeout=REQUEST_TIMEOUT):
+        self.providers = list(providers)
+        self.timeout = timeout
+
+    async def quotes(self, symbols):
+        """
+        ({symbol: (price, source)}, {symbol: reason}) for NSE symbols. Each
+        provider only sees the symbols the ones before it could not price.
+        """
+        remaining = list(dict.fromkeys(symbols))
+        found, reasons = {}, defaultdict(list)
+        for provider in self.providers:
+            if not remaining:
+                break
+            try:
+                prices, errors = await provider.quotes(remaining, self.timeout)
+            except NotImplementedError:
+                continue
+            except Exception as e:
+                prices, errors = {}, {symbol: f"{provider.name}: {_describe(e)}" for symbol in remaining}
+            found.update((symbol, (price, provider.name)) for symbol, price in prices.items())
+            for symbol, reason in errors.items():
+                reasons[symbol].append(reason)
+            remaining = [symbol for symbol in remaining if symbol not in found]
+        return found, {symbol: "; ".join(reasons[symbol]) or "No price found" for symbol in remaining}
+
+    async def quote(self, symbol):
+        """
+        (price, source) from the first provider's live quote(), not the bulk
+        daily-close path; LookupError if none has one.
+        """
+        price, source = await self._first("quote", symbol)
+        return float(price), source
+
+    async def _first(self, method, *args):
+        # A provider answering None (or NaN) has no data for the symbol
+        reasons = []
+        for provider in self.providers:
+            try:
+                value = await getattr(provider, method)(*args, timeout=self.timeout)
+            except NotImplementedError:
+                continue
+            except Exception as e:
+                reasons.append(f"{provider.name}: {_describe(e)}")
+                continue
+            if value is None or (isinstance(value, float) and math.isnan(value)):
+                reasons.append(f"{provider.name}: no data")
+                continue
+            return value, provider.name
+        raise LookupError("; ".join(reasons) or f"No provider offers {method}")
+
+    async def fundamentals(self, symbol):
+        """(info dict, source)."""
+        return await self._first("fundamentals", symbol)
+
+    async def history(self, symbol, days=365):
+        """(daily closes, source)."""
+        return await self._first("history", symbol, days)
+
+
+def default_client():
+    """Process-wide client over EQUISMART_MARKET_PROVIDERS (comma-separated names)."""
+    global _default_client
+    with _default_client_lock:
+        if _default_client is None:
+            names = [name.strip() for name in DEFAULT_PROVIDERS.split(",") if name.strip()]
+            _default_client = MarketDataClient([PROVIDERS[name]() for name in names])
+        return _default_client
+
+
+def run_sync(coro):
+    """Runs a coroutine to completion from synchronous code, e.g. a Streamlit script."""
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return asyncio.run(coro)
+    # Already inside an event loop (notebooks): use a fresh one on another thread
+    with ThreadPoolExecutor(max_workers=1) as pool:
+        return pool.submit(asyncio.run, coro).result()
+
+
+async def timed_batch(coro):
+    """
+    Awaits coro and returns (its result, latency_summary of every provider
+    request it made).
+    """
+    latencies = []
+    _latencies.set(latencies)
+    result = await coro
+    return result, latency_summary(list(latencies))
+
+
+def fetch_quote(symbol):
+    return run_sync(default_client().quote(symbol))
+
+
+def fetch_quotes(symbols):
+    """
+    ({symbol: (price, source)}, {symbol: reason}, latency) for NSE symbols,
+    where latency is the latency_summary of the provider requests made.
+    """
+    (found, reasons), latency = run_sync(timed_batch(default_client().quotes(symbols)))
+    return found, reasons, latency
@@ -0,0 +1,93 @@
+from concurrent.futures import ProcessPoolExecutor
+import numpy as np
+
+TRADING_DAYS = 252
+
+
+def _simulate_chunk(rng, n_paths, steps, daily_drift, daily_vol, log_levels):
+    # Log-price increments for a GBM, float32 to halve the chunk's footprint
+    paths = rng.standard_normal((n_paths, steps), dtype=np.float32)
+    paths *= np.float32(daily_vol)
+    paths += np.float32(daily_drift - 0.5 * daily_vol ** 2)
+    np.cumsum(paths, axis=1, out=paths)
+
+    path_max = paths.max(axis=1)
+    terminal = paths[:, -1]
+    touched = (path_max[:, None] >= log_levels[None, :]).sum(axis=0)
+    finished_above = (terminal[:, None] >= log_levels[None, :]).sum(axis=0)
+    return touched, finished_above, terminal
+
+
+def simulate_outcomes(start_price, volatility, break_even_price, target_price,
+                      horizon_days=TRADING_DAYS, n_paths=100_000, annual_drift=0.0,
+                      chunk_size=10_000, seed=None):
+    """
+    Simulates GBM price paths from start_price using an annualised volatility
+    (as returned by risk_analyzer.analyze_stock_risk) and estimates how likely
+    the position is to get back to break_even_price / target_price.
+
+    Paths are generated chunk_size at a time so memory stays bounded by one
+    chunk regardless of n_paths. The same seed always gives the same result.
+    Returns a dict of touch / finish probabilities and terminal price percentiles.
+    """
+    steps = int(horizon_days)
+    daily_vol = volatility / np.sqrt(TRADING_DAYS)
+    daily_drift = annual_drift / TRADING_DAYS
+    log_levels = np.log(np.array([break_even_price, target_price], dtype=np.float64) / start_price).astype(np.float32)
+
+    chunk_counts = -(-int(n_paths) // chunk_size)
+    if not isinstance(seed, np.random.SeedSequence):
+        seed = np.random.SeedSequence(seed)
+    chunk_seeds = seed.spawn(chunk_counts)
+
+    touched = np.zeros(2, dtype=np.int64)
+    finished_above = np.zeros(2, dtype=np.int64)
+    terminal = np.empty(int(n_paths), dtype=np.float32)
+    done = 0
+    for chunk_seed in chunk_seeds:
+        size = min(chunk_size, n_paths - done)
+        t, f, term = _simulate_chunk(
+            np.random.default_rng(chunk_seed), size, steps, daily_drift, daily_vol, log_levels
+        )
+        touched += t
+        finished_above += f
+        terminal[done:done + size] = term
+        done += size
+
+    terminal_prices = start_price * np.exp(terminal.astype(np.float64))
+    p5, p50, p95 = np.percentile(terminal_prices, [5, 50, 95])
+    return {
+        "paths": int(n_paths),
+        "horizon_days": steps,
+        "prob_touch_break_even": float(touched[0] / n_paths),
+        "prob_touch_target": float(touched[1] / n_paths),
+        "prob_end_above_break_even": float(finished_above[0] / n_paths),
+        "prob_end_above_target": float(finished_above[1] / n_paths),
+        "terminal_p5": float(p5),
+        "terminal_median": float(p50),
+        "terminal_p95": float(p95),
+    }
+
+
+def _simulate_position(args):
+    position, kwargs = args
+    return simulate_outcomes(
+        position["start_price"], position["volatility"],
+        position["break_even_price"], position["target_price"], **kwargs
+    )
+
+
+def simulate_portfolio(positions, processes=None, seed=None, **kwargs):
+    """
+    Runs simulate_outcomes for a list of position dicts (keys: start_price,
+    volatility, break_even_price, target_price). Each stock gets its own child
+    seed, so results are reproducible whether or not a process pool is used.
+    Pass processes > 1 to spread stocks over a ProcessPoolExecutor.
+    """
+    stock_seeds = np.random.SeedSequence(seed).spawn(len(positions))
+    jobs = [(position, dict(kwargs, seed=stock_seed)) for position, stock_seed in zip(positions, stock_seeds)]
+
+    if processes and processes > 1 and len(jobs) > 1:
+        with ProcessPoolExecutor(max_workers=processes) as pool:
+            return list(pool.map(_simulate_position, jobs))
+    return [_simulate_position(job) for job in jobs]
@@ -0,0 +1,43 @@
+import streamlit as st
+from calculations import calculate_averaging
+from monte_carlo import simulate_outcomes
+
+
+@st.cache_data(max_entries=32, show_spinner="Simulating price paths...")
+def cached_outcomes(market_price, volatility, break_even_price, target_price, horizon_days, n_paths, seed):
+    return simulate_outcomes(
+        market_price, volatility, break_even_price, target_price,
+        horizon_days=horizon_days, n_paths=n_paths, seed=seed
+    )
+
+
+def outcome_simulator_ui(current_qty, current_avg_price, market_price, target_avg_price, volatility):
+    with st.expander("🎲 Post-Averaging Outcome Simulator", expanded=False):
+        shares_to_buy, new_avg, _ = calculate_averaging(current_qty, current_avg_price, market_price, target_avg_price)
+        if shares_to_buy is None:
+            st.info("Target average is not reachable, so there is nothing to simulate.")
+            return
+
+        col1, col2, col3 = st.columns(3)
+        with col1:
+            horizon_days = st.number_input("Horizon (trading days)", min_value=5, max_value=1260, value=250)
+        with col2:
+            profit_pct = st.number_input("Target profit over new average (%)", min_value=0.0, value=10.0, step=1.0)
+        with col3:
+            n_paths = st.selectbox("Simulated paths", [10_000, 50_000, 100_000], index=2)
+
+        target_price = new_avg * (1 + profit_pct / 100)
+        outcome = cached_outcomes(
+            float(market_price), float(volatility), float(new_avg), float(target_price),
+            int(horizon_days), int(n_paths), 42
+        )
+
+        st.markdown(f"""
+            <div class='info-message'>
+                📈 Based on 1Y volatility of {volatility:.2f} and a new average of ₹{new_avg:.2f}:<br>
+                Chance to touch break-even (₹{new_avg:.2f}) within {int(horizon_days)} days: <b>{outcome['prob_touch_break_even']:.1%}</b><br>
+                Chance to touch target (₹{target_price:.2f}) within {int(horizon_days)} days: <b>{outcome['prob_touch_target']:.1%}</b><br>
+                Chance to end the horizon above break-even: <b>{outcome['prob_end_above_break_even']:.1%}</b><br>
+                Price range at horizon (5%–95%): ₹{outcome['terminal_p5']:,.2f} – ₹{outcome['terminal_p95']:,.2f}
+            </div>
+        """, unsafe_allow_html=True)
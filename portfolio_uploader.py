@@ -1,9 +1,84 @@
+import uuid
 import streamlit as st
 import pandas as pd
-from calculations import calculate_averaging
-from data_handler import load_and_validate_file
+import numpy as np
+from calculations import calculate_averaging_batch, calculate_averaging_batch_paise, reconcile_paise
+from data_handler import (
+    FINGERPRINT_COLUMN, load_and_validate_files_cached, validate_batch, summarize_rejections, diff_portfolios
+)
+from charges import buy_cost_coefficients
+from allocator import OBJECTIVES, allocate_budget
+from strategies import STRATEGIES, strategy_key, compute_target_prices, strategy_labels, strategy_matrix
+from tradebook import COST_METHODS
+from result_table import UPLOAD_RESULT_SCHEMA, ResultTable
+from snapshot_store import HAS_PYARROW, list_snapshots, load_snapshot, save_snapshot
 from visualization import display_results_table, download_csv_button
 
+def snapshot_owner():
+    """
+    Whose snapshots this session can see and save: the signed-in user when the
+    app has authentication configured, otherwise only this browser session.
+    """
+    user = getattr(st, "user", None)
+    try:
+        if user is not None and user.is_logged_in:
+            return f"user:{user.email}"
+    except (AttributeError, KeyError):
+        pass
+    if "snapshot_owner" not in st.session_state:
+        st.session_state["snapshot_owner"] = f"session:{uuid.uuid4().hex}"
+    return st.session_state["snapshot_owner"]
+
+
+def strategy_param_inputs(key, key_prefix=""):
+    """
+    Number inputs for a tunable strategy's params (none for fixed ones such as
+    "10% below current avg"). Returns the params to pass to compute_target_prices.
+    """
+    strategy = STRATEGIES[key]
+    params = {}
+    if strategy["tunable"]:
+        for name, default in strategy["params"].items():
+            params[name] = st.number_input(
+                f"{strategy['label']} – {name.replace('_', ' ')} (%)",
+                min_value=0.0,
+                value=float(default),
+                step=1.0,
+                key=f"{key_prefix}{key}_{name}"
+            )
+    return params
+
+
+def reused_results(saved_results, fingerprints):
+    """Rows of a snapshot's saved results for the given fingerprints, in that order."""
+    rows = saved_results.drop_duplicates(FINGERPRINT_COLUMN).set_index(FINGERPRINT_COLUMN).loc[fingerprints]
+    return rows.reset_index()
+
+
+@st.cache_data(max_entries=8, show_spinner=False)
+def strategy_comparison_table(df, custom_pct, selected_key, strategy_params):
+    avg = df["Current Average Price"].to_numpy(dtype=float)
+    keys = [strategy_key(label) for label in strategy_labels(df.columns)]
+    params = {selected_key: strategy_params}
+    names, targets, shares, capital, new_avg, valid = strategy_matrix(
+        df["Current Quantity"].to_numpy(dtype=float),
+        avg,
+        df["Current Market Price"].to_numpy(dtype=float),
+        data=df,
+        keys=keys,
+        custom_target=avg * custom_pct / 100,
+        **params
+    )
+
+    table = {("Stock", ""): df["Stock"].to_numpy()}
+    for j, name in enumerate(names):
+        table[(name, "Target")] = np.round(targets[:, j], 2)
+        table[(name, "Shares")] = np.where(valid[:, j], shares[:, j], np.nan)
+        table[(name, "Capital")] = np.round(capital[:, j], 2)
+        table[(name, "New Avg")] = np.round(new_avg[:, j], 2)
+    return pd.DataFrame(table)
+
+
 def portfolio_upload_ui():
     # Enhanced header
     st.markdown("""
@@ -28,17 +103,34 @@ def portfolio_upload_ui():
                 <li style='margin-bottom: 0.5rem;'>📌 <strong>Current Average Price</strong>: Your current average purchase price</li>
                 <li style='margin-bottom: 0.5rem;'>📌 <strong>Current Market Price</strong>: Current market price of the stock</li>
             </ul>
+            <p style='color: #666; margin-bottom: 0;'>Holding the same stock in several demat accounts? Upload one file per account and they are merged into one position.</p>
+            <p style='color: #666; margin-bottom: 0;'>Only have your broker's tradebook? Choose <strong>Broker tradebook</strong> and upload the fills (symbol, trade type, quantity, price, execution time).</p>
         </div>
     """, unsafe_allow_html=True)
     
+    file_kind = st.radio("File contents", ["Holdings", "Broker tradebook"], horizontal=True)
+    cost_method = None
+    if file_kind == "Broker tradebook":
+        cost_method = COST_METHODS[st.selectbox("Cost basis", list(COST_METHODS))]
+
     # File uploader with enhanced styling
-    uploaded_file = st.file_uploader(
+    uploaded_files = st.file_uploader(
         "Upload your portfolio file (CSV or Excel)",
         type=["csv", "xlsx"],
-        help="Upload a CSV or Excel file with your portfolio data"
+        accept_multiple_files=True,
+        help="Upload a CSV or Excel file with your portfolio data, or one file per account"
     )
 
-    if not uploaded_file:
+    # The user's own saved snapshots can be reopened instead of uploading again
+    snapshot_name = None
+    owner = snapshot_owner()
+    snapshots = list_snapshots(owner)
+    if snapshots and not uploaded_files:
+        options = {f"{snap['name']} · {snap['rows']} rows {snap['label']}".strip(): snap["name"] for snap in snapshots}
+        choice = st.selectbox("...or reopen a saved snapshot", ["—"] + list(options))
+        snapshot_name = options.get(choice)
+
+    if not uploaded_files and not snapshot_name:
         st.markdown("""
             <div style='text-align: center; padding: 2rem; background-color: #f8f9fa; border-radius: 12px;'>
                 <p style='color: #666; font-size: 1.1rem;'>👆 Please upload a file to begin</p>
@@ -60,13 +152,22 @@ def portfolio_upload_ui():
     with col1:
         strategy = st.selectbox(
             "Choose your strategy",
-            [
-                "Mean of current avg & market",
-                "10% below current avg",
-                "5% above market price"
-            ],
+            [s["label"] for s in STRATEGIES.values()],
             help="Select how you want to calculate the target average price"
         )
+        key = strategy_key(strategy)
+        strategy_params = strategy_param_inputs(key, "upload_")
+    
+        exact_paise = st.checkbox(
+            "Exact paise arithmetic",
+            value=False,
+            help="Round prices to whole paise and compute share counts with exact integer math"
+        )
+        include_charges = st.checkbox(
+            "Include transaction charges",
+            value=False,
+            help="Add brokerage, STT, exchange fees, GST and stamp duty to every suggested buy"
+        )
     
     with col2:
         st.markdown("""
@@ -80,8 +181,26 @@ def portfolio_upload_ui():
             </div>
         """, unsafe_allow_html=True)
 
-    # Load and validate file
-    df, error = load_and_validate_file(uploaded_file)
+    # Load and validate file, or memory-map a saved snapshot. A fresh upload is
+    # compared with this user's own latest snapshot (never another user's) so
+    # unchanged rows keep their prices/results
+    saved_results = None
+    baseline = snapshots[0] if snapshots else None
+    previous_df = previous_results = previous_settings = None
+    if uploaded_files:
+        if baseline is not None:
+            previous_df, previous_results = load_snapshot(owner, baseline["name"])
+            previous_settings = baseline.get("settings")
+            if FINGERPRINT_COLUMN not in previous_df.columns:
+                previous_df = previous_results = None
+        df, error = load_and_validate_files_cached(
+            uploaded_files, previous_df, cost_method, previous_id=(owner, baseline["name"]) if baseline else None
+        )
+        if df is not None and len(uploaded_files) > 1:
+            st.caption(f"📎 {len(uploaded_files)} files merged into {len(df)} holdings")
+    else:
+        df, saved_results = load_snapshot(owner, snapshot_name)
+        error = None
 
     if error:
         st.markdown(f"""
@@ -99,6 +218,8 @@ def portfolio_upload_ui():
         """, unsafe_allow_html=True)
         return
 
+    portfolio_df = df
+
     # Process data with enhanced progress bar
     st.markdown("""
         <div style='margin: 2rem 0;'>
@@ -111,60 +232,111 @@ def portfolio_upload_ui():
     progress_bar = st.progress(0)
     status_text = st.empty()
     
-    results = []
     total_rows = len(df)
-    
-    for idx, row in df.iterrows():
-        # Update progress
-        progress = (idx + 1) / total_rows
-        progress_bar.progress(progress)
-        status_text.text(f"Processing row {idx + 1} of {total_rows}")
-        
-        current_qty = row["Current Quantity"]
-        current_avg_price = row["Current Average Price"]
-        market_price = row["Current Market Price"]
-
-        if current_qty == 0 or market_price == 0:
-            continue
-
-        if market_price >= current_avg_price:
-            shares, new_avg = None, None
-            profit = (market_price - current_avg_price) * current_qty
-            note = "✅ Profitable"
-        else:
-            if strategy == "Mean of current avg & market":
-                target_avg_price = (current_avg_price + market_price) / 2
-            elif strategy == "10% below current avg":
-                target_avg_price = current_avg_price * 0.90
-            elif strategy == "5% above market price":
-                target_avg_price = market_price * 1.05
-            else:
-                target_avg_price = (current_avg_price + market_price) / 2
-
-            shares, new_avg, profit = calculate_averaging(
-                current_qty,
-                current_avg_price,
-                market_price,
-                target_avg_price
+    status_text.text(f"Processing {total_rows} rows")
+
+    # Drop rows the calculator cannot use (and say why), then work on whole columns at once
+    valid_rows, error_codes = validate_batch(df)
+    if not valid_rows.all():
+        with st.expander(f"⚠️ {int((~valid_rows).sum())} rows skipped", expanded=False):
+            st.dataframe(summarize_rejections(error_codes), hide_index=True)
+    df = df[valid_rows]
+    current_qty = df["Current Quantity"].to_numpy(dtype=float)
+    current_avg_price = df["Current Average Price"].to_numpy(dtype=float)
+    market_price = df["Current Market Price"].to_numpy(dtype=float)
+
+    missing_cols = [col for col in STRATEGIES[key]["requires"] if col not in df.columns]
+    if missing_cols:
+        st.markdown(f"""
+            <div class='error-message'>
+                ❌ "{strategy}" needs these columns in your file: {', '.join(missing_cols)}
+            </div>
+        """, unsafe_allow_html=True)
+        return
+    target_avg_price = compute_target_prices(key, current_avg_price, market_price, df, **strategy_params)
+
+    kernel = calculate_averaging_batch_paise if exact_paise else calculate_averaging_batch
+    charges = {}
+    if include_charges:
+        # Size each order without charges first so capped brokerage is priced per row
+        shares_arr, _, _, _ = calculate_averaging_batch(current_qty, current_avg_price, market_price, target_avg_price)
+        buy_cost_rate, order_cost = buy_cost_coefficients(shares_arr * market_price)
+        charges = {"buy_cost_rate": buy_cost_rate, "order_cost": order_cost}
+    shares_arr, new_avg_arr, profit_arr, valid = kernel(
+        current_qty,
+        current_avg_price,
+        market_price,
+        target_avg_price,
+        **charges
+    )
+    if exact_paise:
+        recon = reconcile_paise(current_qty, current_avg_price, market_price, target_avg_price, **charges)
+        if len(recon["shares_mismatch"]) or len(recon["validity_mismatch"]):
+            st.info(
+                f"ℹ️ {len(recon['shares_mismatch']) + len(recon['validity_mismatch'])} of {recon['rows']} rows "
+                "differ from floating-point results (boundary rounding)."
             )
-            note = "🔻 Loss - Averaging Suggested"
-
-        results.append({
-            "Stock": row["Stock"],
-            "Current Quantity": current_qty,
-            "Current Average Price": round(current_avg_price, 2),
-            "Current Market Price": round(market_price, 2),
-            "Shares to Buy": shares if shares is not None else "N/A",
-            "New Average Price": round(new_avg, 2) if new_avg else "N/A",
-            "Estimated Profit": round(profit, 2) if profit else "N/A",
-            "Smart Note": note
-        })
+    profitable = market_price >= current_avg_price
+    progress_bar.progress(0.5)
+
+    # Rows unchanged since the latest snapshot reuse its results when they were
+    # computed with the same settings; only the rest are rebuilt below
+    settings = {"strategy": key, "params": strategy_params, "exact_paise": exact_paise, "include_charges": include_charges}
+    reuse = np.zeros(len(df), dtype=bool)
+    if previous_df is not None:
+        changes = diff_portfolios(df, previous_df)
+        st.caption(
+            f"♻️ Since your snapshot {baseline['name']}: {int(changes['unchanged'].sum())} unchanged, "
+            f"{int(changes['changed'].sum())} changed, {int(changes['added'].sum())} new, "
+            f"{len(changes['removed'])} removed"
+        )
+        if (
+            previous_results is not None
+            and previous_settings == settings
+            and FINGERPRINT_COLUMN in previous_results.columns
+        ):
+            reuse = df[FINGERPRINT_COLUMN].isin(previous_results[FINGERPRINT_COLUMN]).to_numpy()
+
+    # Results go straight into typed columns: whole blocks, no per-row dicts
+    schema = dict(UPLOAD_RESULT_SCHEMA)
+    if FINGERPRINT_COLUMN in df.columns:
+        schema[FINGERPRINT_COLUMN] = np.uint64
+    table = ResultTable(schema, len(df))
+
+    rows = np.flatnonzero(~reuse)
+    gain = profitable[rows]
+    averaging = ~gain & valid[rows]
+    profit = np.where(gain, (market_price - current_avg_price) * current_qty, profit_arr)[rows]
+    new_rows = {
+        "Stock": df["Stock"].to_numpy()[rows],
+        "Current Quantity": current_qty[rows],
+        "Current Average Price": np.round(current_avg_price[rows], 2),
+        "Current Market Price": np.round(market_price[rows], 2),
+        "Shares to Buy": np.where(averaging, shares_arr[rows], np.nan),
+        "New Average Price": np.where(averaging, np.round(new_avg_arr[rows], 2), np.nan),
+        "Estimated Profit": np.where((gain | averaging) & (profit != 0), np.round(profit, 2), np.nan),
+        "Smart Note": np.where(gain, "✅ Profitable", "🔻 Loss - Averaging Suggested"),
+    }
+    if FINGERPRINT_COLUMN in df.columns:
+        fingerprints = df[FINGERPRINT_COLUMN].to_numpy()
+        new_rows[FINGERPRINT_COLUMN] = fingerprints[rows]
+    table.extend(new_rows)
+
+    if reuse.any():
+        saved = reused_results(previous_results, fingerprints[reuse])
+        table.extend({name: saved[name].to_numpy() for name in schema})
+    result_df = table.to_frame()
+    if reuse.any():
+        order = np.concatenate([rows, np.flatnonzero(reuse)])
+        result_df = result_df.iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+
+    progress_bar.progress(1.0)
 
     # Clear progress indicators
     progress_bar.empty()
     status_text.empty()
 
-    if not results:
+    if result_df.empty:
         st.markdown("""
             <div class='error-message'>
                 ⚠️ No valid rows to calculate.
@@ -182,9 +354,9 @@ def portfolio_upload_ui():
     """, unsafe_allow_html=True)
     
     # Summary statistics with enhanced styling
-    total_stocks = len(results)
-    profitable_stocks = sum(1 for r in results if r["Smart Note"] == "✅ Profitable")
-    loss_stocks = sum(1 for r in results if r["Smart Note"] == "🔻 Loss - Averaging Suggested")
+    total_stocks = len(result_df)
+    profitable_stocks = int((result_df["Smart Note"] == "✅ Profitable").sum())
+    loss_stocks = int((result_df["Smart Note"] == "🔻 Loss - Averaging Suggested").sum())
     
     col1, col2, col3 = st.columns(3)
     with col1:
@@ -210,9 +382,51 @@ def portfolio_upload_ui():
         """, unsafe_allow_html=True)
 
     # Display results table
-    result_df = pd.DataFrame(results)
-    display_results_table(result_df)
+    shown_df = result_df.drop(columns=FINGERPRINT_COLUMN, errors="ignore")
+    display_results_table(shown_df)
     
+    # Budget-constrained allocation across all loss-making positions
+    with st.expander("💰 Allocate a Fixed Budget", expanded=False):
+        budget = st.number_input(
+            "Total cash available for averaging (₹)",
+            min_value=0.0,
+            value=100000.0,
+            step=10000.0,
+            help="Whole-share purchases are spread across loss-making stocks within this budget"
+        )
+        objective_label = st.selectbox("Allocation goal", list(OBJECTIVES.keys()))
+        allocation_df, unspent = allocate_budget(df, target_avg_price, budget, OBJECTIVES[objective_label])
+        if allocation_df.empty:
+            st.info("No loss-making positions need averaging.")
+        else:
+            st.dataframe(allocation_df)
+            st.markdown(f"""
+                <div class='info-message'>
+                    🎯 {int(allocation_df["Reaches Target"].sum())} of {len(allocation_df)} positions reach their target ·
+                    ₹{allocation_df["Capital Used"].sum():,.2f} deployed · ₹{unspent:,.2f} left over
+                </div>
+            """, unsafe_allow_html=True)
+
+    # Every strategy side by side, so picking one is a column filter not a recompute
+    with st.expander("🧮 Compare All Strategies", expanded=False):
+        custom_pct = st.number_input(
+            "Custom target (% of current average price)",
+            min_value=1.0,
+            max_value=100.0,
+            value=95.0,
+            step=1.0
+        )
+        loss_df = df[~profitable]
+        comparison_df = strategy_comparison_table(loss_df, custom_pct, key, strategy_params)
+        if comparison_df.empty:
+            st.info("No loss-making positions to compare.")
+        else:
+            names = list(dict.fromkeys(name for name, _ in comparison_df.columns[1:]))
+            shown = st.multiselect("Strategies", names, default=names)
+            metrics = st.multiselect("Show", ["Target", "Shares", "Capital", "New Avg"], default=["Shares", "Capital", "New Avg"])
+            columns = [("Stock", "")] + [(name, metric) for name in names if name in shown for metric in metrics]
+            st.dataframe(comparison_df[columns], hide_index=True)
+
     # Download button with enhanced styling
     st.markdown("""
         <div style='margin: 2rem 0;'>
@@ -222,7 +436,20 @@ def portfolio_upload_ui():
         </div>
     """, unsafe_allow_html=True)
     
-    download_csv_button(result_df)
+    download_csv_button(shown_df)
+
+    if HAS_PYARROW:
+        col1, col2 = st.columns([2, 1])
+        with col1:
+            snapshot_label = st.text_input("Snapshot label (optional)", value="")
+        with col2:
+            if st.button("💾 Save Snapshot", help="Only you can reopen it (without sign-in: only this browser session)"):
+                name = save_snapshot(owner, portfolio_df, result_df, snapshot_label, settings)
+                st.success(f"Saved snapshot {name}")
+
+    if saved_results is not None:
+        with st.expander("📂 Results saved with this snapshot", expanded=False):
+            st.dataframe(saved_results.drop(columns=FINGERPRINT_COLUMN, errors="ignore"))
 
     # Add simple footer
     st.markdown("""
@@ -0,0 +1,90 @@
+import os
+import sqlite3
+import threading
+import time
+
+# On-disk quote cache shared by every Streamlit worker and batch job on the
+# host. WAL mode lets any number of readers run alongside a single writer, and
+# the file survives restarts.
+QUOTE_DB_PATH = os.environ.get("EQUISMART_QUOTE_DB", "quotes.db")
+
+_local = threading.local()
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS quotes (
+    symbol TEXT PRIMARY KEY,
+    price REAL NOT NULL,
+    source TEXT NOT NULL,
+    fetched_at REAL NOT NULL
+)
+"""
+
+
+def _connection(path=None):
+    # One connection per thread (sqlite3 connections must not be shared)
+    path = path or QUOTE_DB_PATH
+    connections = getattr(_local, "connections", None)
+    if connections is None:
+        connections = _local.connections = {}
+    conn = connections.get(path)
+    if conn is None:
+        conn = sqlite3.connect(path, timeout=5.0, isolation_level=None)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute(_SCHEMA)
+        connections[path] = conn
+    return conn
+
+
+def read_quotes(symbols, max_age, path=None):
+    """
+    Stored quotes no older than max_age seconds, as {symbol: (price, source,
+    fetched_at)}. Symbols without a fresh quote are left out.
+    """
+    symbols = list(symbols)
+    if not symbols:
+        return {}
+    cutoff = time.time() - max_age
+    found = {}
+    try:
+        conn = _connection(path)
+        # Stay well below SQLite's bound-parameter limit
+        for i in range(0, len(symbols), 500):
+            chunk = symbols[i:i + 500]
+            rows = conn.execute(
+                f"SELECT symbol, price, source, fetched_at FROM quotes "
+                f"WHERE fetched_at >= ? AND symbol IN ({','.join('?' * len(chunk))})",
+                [cutoff, *chunk],
+            )
+            found.update((symbol, (price, source, fetched_at)) for symbol, price, source, fetched_at in rows)
+    except sqlite3.Error as e:
+        print(f"Quote store read failed: {e}")
+    return found
+
+
+def read_quote(symbol, max_age, path=None):
+    """(price, source, fetched_at) for one symbol, or None when missing or stale."""
+    return read_quotes([symbol], max_age, path).get(symbol)
+
+
+def write_quotes(quotes, source, path=None):
+    """Stores {symbol: price} fetched from `source` (e.g. "yfinance", "nsetools")."""
+    if not quotes:
+        return
+    now = time.time()
+    try:
+        conn = _connection(path)
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            conn.executemany(
+                "INSERT INTO quotes (symbol, price, source, fetched_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT(symbol) DO UPDATE SET price = excluded.price, "
+                "source = excluded.source, fetched_at = excluded.fetched_at",
+                [(symbol, float(price), source, now) for symbol, price in quotes.items()],
+            )
+    except sqlite3.Error as e:
+        print(f"Quote store write failed: {e}")
+
+
+def write_quote(symbol, price, source, path=None):
+    write_quotes({symbol: price}, source, path)
@@ -0,0 +1,130 @@
+import numpy as np
+import pandas as pd
+
+# Column kinds a ResultTable understands: "category" (symbols, notes, ratings)
+# is stored as int32 codes into one shared list of values, "Int64" is an int64
+# array plus a missing mask, anything else is a plain numpy dtype (floats use
+# NaN for "no value").
+UPLOAD_RESULT_SCHEMA = {
+    "Stock": "category",
+    "Current Quantity": np.float64,
+    "Current Average Price": np.float64,
+    "Current Market Price": np.float64,
+    "Shares to Buy": "Int64",
+    "New Average Price": np.float64,
+    "Estimated Profit": np.float64,
+    "Smart Note": "category",
+}
+
+RISK_RESULT_SCHEMA = {
+    "Stock": "category",
+    "Current Avg": np.float64,
+    "Market Price": np.float64,
+    "Target Avg": np.float64,
+    "Buy Qty": "Int64",
+    "New Avg": np.float64,
+    "Est. Profit": np.float64,
+    "Risk": "category",
+    "Rating": "category",
+    "Allowed": "category",
+}
+
+
+class ResultTable:
+    """
+    Batch results collected straight into preallocated typed columns, instead
+    of a list of per-row dicts turned into a DataFrame at the end. Rows can be
+    added one at a time (append) or a block of whole columns at once (extend);
+    to_frame hands the filled part of each array to pandas without copying
+    object values.
+    """
+
+    def __init__(self, schema, capacity):
+        self.schema = dict(schema)
+        self.size = 0
+        self._values = {}
+        self._masks = {}
+        self._categories = {}
+        for name, kind in self.schema.items():
+            if kind == "category":
+                self._values[name] = np.full(capacity, -1, dtype=np.int32)
+                self._categories[name] = {}
+            elif kind == "Int64":
+                self._values[name] = np.zeros(capacity, dtype=np.int64)
+                self._masks[name] = np.ones(capacity, dtype=bool)
+            else:
+                self._values[name] = np.full(capacity, np.nan if np.dtype(kind).kind == "f" else 0, dtype=kind)
+
+    def _reserve(self, rows):
+        needed = self.size + rows
+        capacity = len(next(iter(self._values.values())))
+        if needed <= capacity:
+            return
+        capacity = max(needed, 2 * capacity)
+        for name, values in self._values.items():
+            fill = -1 if self.schema[name] == "category" else np.nan if values.dtype.kind == "f" else 0
+            grown = np.full(capacity, fill, dtype=values.dtype)
+            grown[:self.size] = values[:self.size]
+            self._values[name] = grown
+        for name, mask in self._masks.items():
+            grown = np.ones(capacity, dtype=bool)
+            grown[:self.size] = mask[:self.size]
+            self._masks[name] = grown
+
+    def _intern(self, name, values):
+        codes, uniques = pd.factorize(np.asarray(values, dtype=object))
+        lookup = self._categories[name]
+        mapped = np.array([lookup.setdefault(value, len(lookup)) for value in uniques] + [-1], dtype=np.int32)
+        return mapped[codes]
+
+    def append(self, row):
+        """Adds one row given as {column: value}; missing or None values stay empty."""
+        self._reserve(1)
+        i = self.size
+        for name, value in row.items():
+            kind = self.schema[name]
+            if value is None or pd.isna(value):
+                continue
+            if kind == "category":
+                lookup = self._categories[name]
+                self._values[name][i] = lookup.setdefault(value, len(lookup))
+            else:
+                self._values[name][i] = value
+                if kind == "Int64":
+                    self._masks[name][i] = False
+        self.size += 1
+
+    def extend(self, columns):
+        """Adds a block of rows given as {column: array}, all of the same length."""
+        rows = len(next(iter(columns.values())))
+        self._reserve(rows)
+        block = slice(self.size, self.size + rows)
+        for name, values in columns.items():
+            kind = self.schema[name]
+            if kind == "category":
+                self._values[name][block] = self._intern(name, values)
+                continue
+            numbers = np.asarray(values)
+            if numbers.dtype.kind not in "biuf":
+                # e.g. None / "N/A" cells from older snapshots
+                numbers = pd.to_numeric(pd.Series(values), errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+            if kind == "Int64":
+                missing = np.isnan(numbers) if numbers.dtype.kind == "f" else np.zeros(rows, dtype=bool)
+                self._values[name][block] = np.where(missing, 0, numbers).astype(np.int64)
+                self._masks[name][block] = missing
+            else:
+                self._values[name][block] = numbers
+        self.size += rows
+
+    def to_frame(self):
+        n = self.size
+        data = {}
+        for name, kind in self.schema.items():
+            values = self._values[name][:n]
+            if kind == "category":
+                data[name] = pd.Categorical.from_codes(values, categories=list(self._categories[name]))
+            elif kind == "Int64":
+                data[name] = pd.arrays.IntegerArray(values, self._masks[name][:n])
+            else:
+                data[name] = values
+        return pd.DataFrame(data)
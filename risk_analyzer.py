@@ -247,105 +247,158 @@
 #             "raw_info": {}
 #         }
 
-import yfinance as yf
+import asyncio
+import time
 import numpy as np
-import datetime
+from market_data import default_client, gather_within, run_sync
+from fetch_pool import latency_summary
+
+# Overall time allowed for a batch of risk lookups
+RISK_BATCH_DEADLINE = 120.0
+
+def assess_stock_risk(info, closes):
+    """
+    Scores fundamentals (Yahoo-style info dict) and volatility (daily closes)
+    into a risk level and investment suggestion.
+    """
+    # Key metrics
+    pe = info.get("trailingPE") or info.get("forwardPE")
+    roe = info.get("returnOnEquity")
+    if roe is not None:
+        roe = round(roe * 100, 2)
+
+    eps = info.get("trailingEps")
+    sector = info.get("sector")
+    industry = info.get("industry")
+
+    # Convert market cap to ₹ Crores (1 Cr = 10^7)
+    market_cap_raw = info.get("marketCap")
+    market_cap = f"{round(market_cap_raw / 1e7, 2)} Cr" if market_cap_raw else "N/A"
+
+    # Historical volatility (1-year std dev)
+    hist = closes.pct_change().dropna()
+    volatility = np.std(hist) * np.sqrt(252) if len(hist) > 30 else None
+
+    # Fundamental scoring
+    score = 0
+    reasons = []
+
+    if pe is not None and pe < 25:
+        score += 1
+        reasons.append("✔️ P/E ratio is reasonable")
+    else:
+        reasons.append("❌ P/E ratio too high or unavailable")
+
+    if roe is not None and roe > 12:
+        score += 1
+        reasons.append("✔️ ROE is strong")
+    else:
+        reasons.append("❌ ROE is weak or unavailable")
+
+    if eps is not None and eps > 0:
+        score += 1
+        reasons.append("✔️ EPS is positive")
+    else:
+        reasons.append("❌ EPS is negative or missing")
+
+    # Classify fundamentals
+    if score >= 3:
+        fundamentals_rating = "Good"
+    elif score == 2:
+        fundamentals_rating = "Average"
+    else:
+        fundamentals_rating = "Poor"
+
+    # Risk level based on volatility
+    if volatility is None:
+        risk_level = "Unknown"
+    elif volatility < 0.25:
+        risk_level = "Low"
+    elif volatility < 0.5:
+        risk_level = "Moderate"
+    else:
+        risk_level = "High"
+        reasons.append(f"⚠️ High volatility detected: {volatility:.2f}")
+
+    # Final investment suggestion
+    allowed = fundamentals_rating == "Good" and risk_level in ["Low", "Moderate"]
+
+    return {
+        "pe": pe,
+        "roe": roe,
+        "eps": eps,
+        "volatility": volatility,
+        "risk_level": risk_level,
+        "fundamentals_rating": fundamentals_rating,
+        "market_cap": market_cap,
+        "sector": sector,
+        "industry": industry,
+        "allowed": allowed,
+        "reasons": reasons,
+        "raw_info": info
+    }
+
+
+async def analyze_stock_risk_async(stock_code, client=None):
+    """
+    Fetches fundamentals and one year of closes concurrently through the
+    market_data providers, then scores them with assess_stock_risk.
+    """
+    client = client or default_client()
+    try:
+        (info, _), (closes, _) = await asyncio.gather(
+            client.fundamentals(stock_code),
+            client.history(stock_code, days=365)
+        )
+        return assess_stock_risk(info, closes)
+    except Exception as e:
+        return _unknown_risk(e)
+
+
+def _unknown_risk(error):
+    return {
+        "pe": None, "roe": None, "eps": None,
+        "volatility": None,
+        "risk_level": "Unknown", "fundamentals_rating": "Unknown",
+        "market_cap": "N/A", "sector": None, "industry": None,
+        "allowed": False,
+        "reasons": [f"⚠️ Error fetching data: {error}"],
+        "raw_info": {}
+    }
+
 
 def analyze_stock_risk(stock_code):
     """
     Fetches and analyzes stock fundamentals and risk metrics for a given NSE stock code.
     Returns a dictionary with fundamentals, risk level, and investment suggestion.
     """
-    try:
-        ticker = yf.Ticker(stock_code + ".NS")
-        info = ticker.info
-
-        # Fetch key metrics
-        pe = info.get("trailingPE") or info.get("forwardPE")
-        roe = info.get("returnOnEquity")
-        if roe is not None:
-            roe = round(roe * 100, 2)
-
-        eps = info.get("trailingEps")
-        sector = info.get("sector")
-        industry = info.get("industry")
-
-        # Convert market cap to ₹ Crores (1 Cr = 10^7)
-        market_cap_raw = info.get("marketCap")
-        market_cap = f"{round(market_cap_raw / 1e7, 2)} Cr" if market_cap_raw else "N/A"
-
-        # Historical volatility (1-year std dev)
-        end = datetime.datetime.today()
-        start = end - datetime.timedelta(days=365)
-        hist = ticker.history(start=start, end=end)["Close"].pct_change().dropna()
-        volatility = np.std(hist) * np.sqrt(252) if len(hist) > 30 else None
-
-        # Fundamental scoring
-        score = 0
-        reasons = []
-
-        if pe is not None and pe < 25:
-            score += 1
-            reasons.append("✔️ P/E ratio is reasonable")
-        else:
-            reasons.append("❌ P/E ratio too high or unavailable")
+    return run_sync(analyze_stock_risk_async(stock_code))
 
-        if roe is not None and roe > 12:
-            score += 1
-            reasons.append("✔️ ROE is strong")
-        else:
-            reasons.append("❌ ROE is weak or unavailable")
-
-        if eps is not None and eps > 0:
-            score += 1
-            reasons.append("✔️ EPS is positive")
-        else:
-            reasons.append("❌ EPS is negative or missing")
 
-        # Classify fundamentals
-        if score >= 3:
-            fundamentals_rating = "Good"
-        elif score == 2:
-            fundamentals_rating = "Average"
-        else:
-            fundamentals_rating = "Poor"
-
-        # Risk level based on volatility
-        if volatility is None:
-            risk_level = "Unknown"
-        elif volatility < 0.25:
-            risk_level = "Low"
-        elif volatility < 0.5:
-            risk_level = "Moderate"
+def analyze_stocks_risk(stock_codes, client=None, deadline=RISK_BATCH_DEADLINE):
+    """
+    analyze_stock_risk for many stocks, multiplexed on one event loop (the
+    providers' rate limits still apply). Lookups not finished after `deadline`
+    seconds are given up and reported as errors. Returns ({stock_code:
+    result}, latency_summary of the per-stock lookups that finished).
+    """
+    stock_codes = list(dict.fromkeys(stock_codes))
+
+    async def timed(code, client):
+        started = time.perf_counter()
+        result = await analyze_stock_risk_async(code, client)
+        return result, time.perf_counter() - started
+
+    async def run_all():
+        batch_client = client or default_client()
+        return await gather_within((timed(code, batch_client) for code in stock_codes), deadline)
+
+    outcomes = run_sync(run_all()) if stock_codes else []
+    risks, latencies = {}, []
+    for code, outcome in zip(stock_codes, outcomes):
+        if isinstance(outcome, BaseException):
+            risks[code] = _unknown_risk(outcome)
         else:
-            risk_level = "High"
-            reasons.append(f"⚠️ High volatility detected: {volatility:.2f}")
-
-        # Final investment suggestion
-        allowed = fundamentals_rating == "Good" and risk_level in ["Low", "Moderate"]
-
-        return {
-            "pe": pe,
-            "roe": roe,
-            "eps": eps,
-            "volatility": volatility,
-            "risk_level": risk_level,
-            "fundamentals_rating": fundamentals_rating,
-            "market_cap": market_cap,
-            "sector": sector,
-            "industry": industry,
-            "allowed": allowed,
-            "reasons": reasons,
-            "raw_info": info
-        }
-
-    except Exception as e:
-        return {
-            "pe": None, "roe": None, "eps": None,
-            "volatility": None,
-            "risk_level": "Unknown", "fundamentals_rating": "Unknown",
-            "market_cap": "N/A", "sector": None, "industry": None,
-            "allowed": False,
-            "reasons": [f"⚠️ Error fetching data: {e}"],
-            "raw_info": {}
-        }
+            risks[code], elapsed = outcome
+            latencies.append(elapsed)
+    return risks, latency_summary(latencies)
@@ -0,0 +1,89 @@
+import datetime
+import hashlib
+import json
+import os
+
+try:
+    import pyarrow as pa
+    HAS_PYARROW = True
+except ImportError:
+    HAS_PYARROW = False
+
+# Snapshots are uncompressed Arrow IPC files, which can be memory-mapped on
+# reload instead of parsed. One folder per snapshot, named by its timestamp,
+# inside a folder per owner so users never see each other's portfolios.
+SNAPSHOT_DIR = os.environ.get("EQUISMART_SNAPSHOT_DIR", "snapshots")
+
+
+def _owner_dir(directory, owner):
+    # Owners are hashed so an identity (e.g. an email) never becomes a path
+    return os.path.join(directory, hashlib.sha256(owner.encode()).hexdigest()[:32])
+
+
+def _to_arrow(df):
+    try:
+        return pa.Table.from_pandas(df, preserve_index=False)
+    except (pa.ArrowInvalid, pa.ArrowTypeError):
+        # Result tables mix numbers with "N/A" strings; store such columns as text
+        mixed = {col: str for col in df.columns if df[col].dtype == object}
+        return pa.Table.from_pandas(df.astype(mixed), preserve_index=False)
+
+
+def _write_table(df, path):
+    table = _to_arrow(df)
+    with pa.OSFile(path, "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _read_table(path):
+    with pa.memory_map(path, "r") as source:
+        return pa.ipc.open_file(source).read_all().to_pandas()
+
+
+def save_snapshot(owner, portfolio_df, results_df=None, label="", settings=None, directory=SNAPSHOT_DIR):
+    """
+    Persists a validated portfolio (and optionally its results) for `owner`,
+    an opaque identity string. `settings` records what the results were
+    computed with, so a later upload can tell whether they are still
+    reusable. Returns the snapshot name.
+    """
+    directory = _owner_dir(directory, owner)
+    created = datetime.datetime.now()
+    name = created.strftime("%Y-%m-%d_%H%M%S")
+    if os.path.exists(os.path.join(directory, name)):
+        name = created.strftime("%Y-%m-%d_%H%M%S_%f")
+    path = os.path.join(directory, name)
+    os.makedirs(path)
+
+    _write_table(portfolio_df, os.path.join(path, "portfolio.arrow"))
+    if results_df is not None:
+        _write_table(results_df, os.path.join(path, "results.arrow"))
+    with open(os.path.join(path, "meta.json"), "w") as f:
+        json.dump({"created": created.isoformat(), "label": label, "rows": len(portfolio_df), "settings": settings}, f)
+    return name
+
+
+def list_snapshots(owner, directory=SNAPSHOT_DIR):
+    """`owner`'s saved snapshots, newest first, as a list of dicts (name, created, label, rows, settings)."""
+    directory = _owner_dir(directory, owner)
+    if not HAS_PYARROW or not os.path.isdir(directory):
+        return []
+    snapshots = []
+    for name in os.listdir(directory):
+        meta_path = os.path.join(directory, name, "meta.json")
+        if not os.path.isfile(meta_path):
+            continue
+        with open(meta_path) as f:
+            meta = json.load(f)
+        snapshots.append({"name": name, **meta})
+    return sorted(snapshots, key=lambda s: s["created"], reverse=True)
+
+
+def load_snapshot(owner, name, directory=SNAPSHOT_DIR):
+    """Memory-maps one of `owner`'s snapshots back into (portfolio_df, results_df or None)."""
+    path = os.path.join(_owner_dir(directory, owner), name)
+    portfolio_df = _read_table(os.path.join(path, "portfolio.arrow"))
+    results_path = os.path.join(path, "results.arrow")
+    results_df = _read_table(results_path) if os.path.isfile(results_path) else None
+    return portfolio_df, results_df
@@ -0,0 +1,124 @@
+import numpy as np
+from calculations import calculate_averaging_batch
+
+# Registry of target-price strategies, keyed by a short id. Each entry holds the
+# UI label, a vectorized function (avg, market, data, **params) -> target prices,
+# default params, any extra input columns it needs, a one-line explanation and
+# whether its params should be offered to the user (labels like "N%").
+STRATEGIES = {}
+
+
+def register_strategy(key, label, explain, requires=(), tunable=False, **params):
+    def decorator(func):
+        STRATEGIES[key] = {
+            "label": label,
+            "func": func,
+            "params": params,
+            "requires": tuple(requires),
+            "explain": explain,
+            "tunable": tunable,
+        }
+        return func
+    return decorator
+
+
+def _above_market(avg, market, data, pct):
+    return market * (1 + pct / 100)
+
+
+@register_strategy(
+    "mean", "Mean of current avg & market",
+    "Average of ₹{avg:g} and ₹{market:g} → ₹{target:g}"
+)
+def _mean_of_avg_and_market(avg, market, data):
+    return (avg + market) / 2
+
+
+@register_strategy(
+    "below_avg", "10% below current avg",
+    "{pct:g}% below current average ₹{avg:g} → ₹{target:g}",
+    pct=10.0
+)
+def _below_avg(avg, market, data, pct):
+    return avg * (1 - pct / 100)
+
+
+register_strategy(
+    "above_market", "5% above market price",
+    "{pct:g}% above market price ₹{market:g} → ₹{target:g}",
+    pct=5.0
+)(_above_market)
+
+register_strategy(
+    "rebound_breakeven", "Breakeven on N% rebound",
+    "Break even if ₹{market:g} rebounds {pct:g}% → ₹{target:g}",
+    tunable=True, pct=10.0
+)(_above_market)
+
+
+@register_strategy(
+    "below_52w_low", "x% below 52-week low",
+    "{pct:g}% below 52-week low → ₹{target:g}",
+    requires=("52 Week Low",), tunable=True, pct=5.0
+)
+def _below_52_week_low(avg, market, data, pct):
+    return np.asarray(data["52 Week Low"], dtype=np.float64) * (1 - pct / 100)
+
+
+def strategy_labels(columns=()):
+    """Labels of the registered strategies whose required columns are available."""
+    return [s["label"] for s in STRATEGIES.values() if set(s["requires"]).issubset(columns)]
+
+
+def strategy_key(label):
+    for key, strategy in STRATEGIES.items():
+        if strategy["label"] == label:
+            return key
+    raise KeyError(f"Unknown strategy: {label}")
+
+
+def compute_target_prices(key, current_avg_price, market_price, data=None, **params):
+    """
+    Evaluates one strategy over whole price columns in a single pass.
+    Params not given fall back to the strategy's registered defaults.
+    """
+    strategy = STRATEGIES[key]
+    avg = np.asarray(current_avg_price, dtype=np.float64)
+    market = np.asarray(market_price, dtype=np.float64)
+    return strategy["func"](avg, market, data, **{**strategy["params"], **params})
+
+
+def explain_target(key, current_avg_price, market_price, target_avg_price, **params):
+    strategy = STRATEGIES[key]
+    return strategy["explain"].format(
+        avg=current_avg_price, market=market_price, target=target_avg_price,
+        **{**strategy["params"], **params}
+    )
+
+
+def strategy_matrix(current_qty, current_avg_price, market_price, data=None, keys=None, custom_target=None, **params):
+    """
+    Evaluates several strategies (all registered ones by default, plus an
+    optional custom target column) for every row at once. Targets are stacked
+    into a rows x strategies array and go through the batch kernel in one call.
+    `params` maps a strategy key to param overrides.
+    Returns (names, targets, shares, capital, new_avg, valid), the arrays
+    shaped (rows, len(names)).
+    """
+    qty = np.asarray(current_qty, dtype=np.float64)
+    avg = np.asarray(current_avg_price, dtype=np.float64)
+    market = np.asarray(market_price, dtype=np.float64)
+    keys = list(STRATEGIES) if keys is None else list(keys)
+
+    names = [STRATEGIES[key]["label"] for key in keys]
+    columns = [compute_target_prices(key, avg, market, data, **params.get(key, {})) for key in keys]
+    if custom_target is not None:
+        names.append("Custom target")
+        columns.append(np.broadcast_to(np.asarray(custom_target, dtype=np.float64), avg.shape))
+
+    targets = np.column_stack(columns) if columns else np.empty((len(avg), 0))
+    shares, new_avg, _, valid = calculate_averaging_batch(
+        qty[:, None], avg[:, None], market[:, None], targets
+    )
+    capital = np.where(valid, shares * market[:, None], np.nan)
+    return names, targets, shares, capital, new_avg, valid
@@ -0,0 +1,73 @@
+import os
+import streamlit as st
+from backtester import DEFAULT_STRATEGIES, load_closes, run_backtest, summarize_backtest
+from strategies import STRATEGIES
+
+
+@st.cache_data(ttl=3600, show_spinner="Downloading price history...")
+def cached_closes(symbols, years):
+    return load_closes(list(symbols), years)
+
+
+def strategy_backtest_ui():
+    st.markdown("""
+        <div style='text-align: center; margin: 2rem 0;'>
+            <h2 style='color: #1f1f1f; font-size: 1.8rem; font-weight: 600;'>
+                ⏪ Backtest Averaging Strategies
+            </h2>
+            <p style='color: #666; font-size: 1.1rem;'>
+                Replay daily closes and see how each strategy would have averaged down
+            </p>
+        </div>
+    """, unsafe_allow_html=True)
+
+    with st.form("backtest_form"):
+        symbols_text = st.text_area(
+            "NSE symbols (comma or newline separated)",
+            value="RELIANCE, TCS, INFY, HDFCBANK, ITC",
+            help="Up to several hundred symbols"
+        )
+        col1, col2, col3, col4 = st.columns(4)
+        with col1:
+            years = st.number_input("Years of history", min_value=1, max_value=20, value=10)
+        with col2:
+            trigger_pct = st.number_input("Average when down (%)", min_value=1.0, max_value=90.0, value=10.0)
+        with col3:
+            max_rounds = st.number_input("Max averaging rounds", min_value=1, max_value=10, value=3)
+        with col4:
+            min_gap_days = st.number_input("Min days between buys", min_value=1, max_value=250, value=20)
+        strategy_labels = st.multiselect(
+            "Strategies",
+            [STRATEGIES[key]["label"] for key in STRATEGIES if not STRATEGIES[key]["requires"]],
+            default=[STRATEGIES[key]["label"] for key in DEFAULT_STRATEGIES]
+        )
+        submitted = st.form_submit_button("Run Backtest")
+
+    if not submitted:
+        return
+
+    symbols = tuple(dict.fromkeys(s.strip().upper() for s in symbols_text.replace("\n", ",").split(",") if s.strip()))
+    keys = [key for key in STRATEGIES if STRATEGIES[key]["label"] in strategy_labels]
+    if not symbols or not keys:
+        st.warning("⚠️ Enter at least one symbol and pick at least one strategy.")
+        return
+
+    closes = cached_closes(symbols, int(years)).dropna(axis=1, how="all")
+    if closes.empty:
+        st.error("❌ Could not download price history for these symbols.")
+        return
+
+    with st.spinner("Running backtest..."):
+        results = run_backtest(
+            closes,
+            strategy_keys=keys,
+            trigger_pct=trigger_pct,
+            max_rounds=int(max_rounds),
+            min_gap_days=int(min_gap_days),
+            processes=os.cpu_count() if len(closes.columns) > 200 else None
+        )
+
+    st.markdown("### 📊 Strategy Summary")
+    st.dataframe(summarize_backtest(results).round(2), hide_index=True)
+    st.markdown("### 📋 Per-Stock Results")
+    st.dataframe(results.round(2), hide_index=True)
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+from calculations import calculate_averaging, calculate_averaging_batch
+
+
+def scalar_results(qty, avg, market, target, rate=None, fixed=None):
+    rate = np.zeros(len(qty)) if rate is None else rate
+    fixed = np.zeros(len(qty)) if fixed is None else fixed
+    rows = [calculate_averaging(*args) for args in zip(qty, avg, market, target, rate, fixed)]
+    valid = np.array([row[0] is not None for row in rows])
+    shares = np.array([row[0] if row[0] is not None else 0 for row in rows], dtype=np.int64)
+    new_avg = np.array([row[1] if row[1] is not None else np.nan for row in rows])
+    profit = np.array([row[2] if row[2] is not None else np.nan for row in rows])
+    return shares, new_avg, profit, valid
+
+
+def assert_parity(qty, avg, market, target, rate=None, fixed=None):
+    charges = {} if rate is None else {"buy_cost_rate": rate, "order_cost": fixed}
+    batch = calculate_averaging_batch(qty, avg, market, target, **charges)
+    scalar = scalar_results(qty, avg, market, target, rate, fixed)
+
+    np.testing.assert_array_equal(batch[3], scalar[3])
+    np.testing.assert_array_equal(batch[0], scalar[0])
+    np.testing.assert_allclose(batch[1], scalar[1], rtol=1e-12, equal_nan=True)
+    np.testing.assert_allclose(batch[2], scalar[2], rtol=1e-12, atol=1e-6, equal_nan=True)
+
+
+def test_batch_matches_scalar_edge_cases():
+    cases = np.array([
+        # qty, avg, market, target
+        [100, 200.0, 150.0, 170.0],   # averaging down, reachable
+        [100, 200.0, 150.0, 150.0],   # target equals market price
+        [100, 200.0, 150.0, 140.0],   # target below market: unreachable
+        [100, 200.0, 150.0, 210.0],   # target above current average
+        [100, 150.0, 200.0, 170.0],   # averaging up, reachable
+        [100, 150.0, 200.0, 140.0],   # averaging up below current average: unreachable
+        [100, 150.0, 150.0, 150.0],   # everything equal
+        [0, 150.0, 150.0, 150.0],     # no holding and nothing to buy: invalid
+        [0, 0.0, 100.0, 120.0],       # no holding, target above market: unreachable
+        [7, 123.45, 67.89, 99.99],    # ceil of a non-integer share count
+    ])
+    assert_parity(*cases.T)
+
+
+def test_batch_matches_scalar_with_charges():
+    cases = np.array([
+        [100, 200.0, 150.0, 170.0, 0.001, 20.0],
+        [100, 200.0, 150.0, 150.15, 0.001, 0.0],  # target equals buy price incl. charges
+        [100, 200.0, 150.0, 150.0, 0.001, 20.0],  # target below buy price: unreachable
+        [50, 80.0, 60.0, 75.0, 0.0012, 15.93],
+    ])
+    qty, avg, market, target, rate, fixed = cases.T
+    assert_parity(qty, avg, market, target, rate, fixed)
+
+
+@pytest.mark.parametrize("seed", [0, 1, 2])
+def test_batch_matches_scalar_on_random_rows(seed):
+    rng = np.random.default_rng(seed)
+    n = 20_000
+    # Whole-rupee prices so equal-price and boundary rows come up often
+    qty = rng.integers(0, 500, n).astype(float)
+    avg = rng.integers(1, 300, n).astype(float)
+    market = rng.integers(1, 300, n).astype(float)
+    target = rng.integers(1, 300, n).astype(float)
+    assert_parity(qty, avg, market, target)
+
+    rate = rng.choice([0.0, 0.001, 0.0025], n)
+    fixed = rng.choice([0.0, 20.0], n)
+    # Targets exactly at the buy price including charges
+    assert_parity(qty, avg, market, market * (1 + rate), rate, fixed)
+    assert_parity(qty, avg, market, target, rate, fixed)
@@ -0,0 +1,35 @@
+import io
+import pytest
+import data_handler
+from data_handler import FINGERPRINT_COLUMN, load_and_validate_files, load_and_validate_files_cached
+
+
+def upload(name, text):
+    f = io.BytesIO(text.encode())
+    f.name = name
+    return f
+
+
+@pytest.fixture(autouse=True)
+def offline_prices(monkeypatch):
+    monkeypatch.setattr(data_handler, "get_live_prices", lambda symbols: ({s: 1500.0 for s in symbols}, {}, {}))
+    monkeypatch.setattr(data_handler, "_upload_cache", data_handler.OrderedDict())
+    monkeypatch.setattr(data_handler, "_upload_cache_bytes", 0)
+
+
+def test_cached_upload_is_keyed_by_baseline_snapshot():
+    text = "Stock,Current Quantity,Current Average Price\nINFY,10,1600\n"
+    fresh, _ = load_and_validate_files([upload("holdings.csv", text)])
+    old = fresh.assign(**{"Current Market Price": 1400.0})
+    newer = fresh.assign(**{"Current Market Price": 1450.0})
+
+    first, _ = load_and_validate_files_cached([upload("holdings.csv", text)], old, previous_id=("a", "snap-1"))
+    second, _ = load_and_validate_files_cached([upload("holdings.csv", text)], newer, previous_id=("a", "snap-2"))
+    third, _ = load_and_validate_files_cached([upload("holdings.csv", text)], old)
+    fourth, _ = load_and_validate_files_cached([upload("holdings.csv", text)], newer)
+
+    assert first[FINGERPRINT_COLUMN].tolist() == second[FINGERPRINT_COLUMN].tolist()
+    assert first["Current Market Price"].tolist() == [1400.0]
+    assert second["Current Market Price"].tolist() == [1450.0]
+    assert third["Current Market Price"].tolist() == [1400.0]
+    assert fourth["Current Market Price"].tolist() == [1450.0]
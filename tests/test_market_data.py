@@ -0,0 +1,90 @@
+import time
+import numpy as np
+import pandas as pd
+import fetch_pool
+from market_data import FixtureProvider, MarketDataClient, MarketDataProvider, _blocking, run_sync, timed_batch
+from risk_analyzer import analyze_stocks_risk
+
+
+class SlowProvider(MarketDataProvider):
+    """Every lookup is a blocking call of `delay` seconds under the "slow-test" limiter."""
+    name = "slow-test"
+
+    def __init__(self, delay):
+        self.delay = delay
+        self.closes = 100 + np.cumsum(np.random.default_rng(0).normal(size=250))
+
+    def _sleep(self, value):
+        time.sleep(self.delay)
+        return value
+
+    async def fundamentals(self, symbol, timeout=None):
+        return await _blocking(self.name, self._sleep, {"trailingPE": 15, "returnOnEquity": 0.2, "trailingEps": 5}, timeout=timeout)
+
+    async def history(self, symbol, days, timeout=None):
+        return await _blocking(self.name, self._sleep, pd.Series(self.closes), timeout=timeout)
+
+    async def quote(self, symbol, timeout=None):
+        return await _blocking(self.name, self._sleep, 100.0, timeout=timeout)
+
+
+def test_batch_queued_behind_rate_limit_does_not_time_out(monkeypatch):
+    # 200 lookups at 50/s take ~4 s, far longer than the 0.5 s per-request timeout
+    monkeypatch.setitem(fetch_pool.PROVIDER_LIMITS, "slow-test", {"rate": 50.0, "burst": 5, "max_in_flight": 5})
+    monkeypatch.setattr(fetch_pool, "_limiters", {})
+    client = MarketDataClient([SlowProvider(delay=0.05)], timeout=0.5)
+    symbols = [f"SYM{i}" for i in range(100)]
+
+    risks, latency = analyze_stocks_risk(symbols, client=client)
+
+    assert set(risks) == set(symbols)
+    assert [s for s, risk in risks.items() if risk["fundamentals_rating"] == "Unknown"] == []
+    assert latency["calls"] == 100
+
+
+def test_batch_deadline_reports_unfinished_stocks(monkeypatch):
+    monkeypatch.setitem(fetch_pool.PROVIDER_LIMITS, "slow-test", {"rate": 5.0, "burst": 1, "max_in_flight": 1})
+    monkeypatch.setattr(fetch_pool, "_limiters", {})
+    client = MarketDataClient([SlowProvider(delay=0.05)], timeout=0.5)
+
+    risks, latency = analyze_stocks_risk([f"SYM{i}" for i in range(20)], client=client, deadline=0.5)
+
+    unfinished = [risk for risk in risks.values() if risk["risk_level"] == "Unknown"]
+    assert unfinished and "deadline exceeded" in unfinished[0]["reasons"][0]
+    assert latency["calls"] == 20 - len(unfinished)
+
+
+def test_single_quote_uses_live_quote_not_bulk_close():
+    class BulkIsStale(FixtureProvider):
+        async def quotes(self, symbols, timeout=None, deadline=None):
+            return {symbol: 1.0 for symbol in symbols}, {}
+
+    client = MarketDataClient([BulkIsStale(quotes={"INFY": 1500.0}, path=None)])
+
+    assert run_sync(client.quote("INFY")) == (1500.0, "fixture")
+    assert run_sync(client.quotes(["INFY"])) == ({"INFY": (1.0, "fixture")}, {})
+
+
+def test_quotes_fall_through_providers():
+    client = MarketDataClient([
+        FixtureProvider(quotes={"INFY": 1500.0}, path=None),
+        FixtureProvider(quotes={"TCS": 3500.0}, path=None),
+    ])
+
+    found, errors = run_sync(client.quotes(["INFY", "TCS", "XYZ"]))
+
+    assert found == {"INFY": (1500.0, "fixture"), "TCS": (3500.0, "fixture")}
+    assert list(errors) == ["XYZ"]
+
+
+def test_batch_latency_counts_each_admitted_request(monkeypatch):
+    monkeypatch.setitem(fetch_pool.PROVIDER_LIMITS, "slow-test", {"rate": 100.0, "burst": 5, "max_in_flight": 5})
+    monkeypatch.setattr(fetch_pool, "_limiters", {})
+    client = MarketDataClient([SlowProvider(delay=0.05)], timeout=0.5)
+
+    (found, errors), latency = run_sync(timed_batch(client.quotes([f"SYM{i}" for i in range(20)])))
+
+    assert len(found) == 20 and errors == {}
+    assert latency["calls"] == 20
+    # Measured from admission, so queueing behind the 5-slot limit is not included
+    assert 40 <= latency["p50_ms"] < 400
@@ -0,0 +1,19 @@
+import pandas as pd
+import pytest
+from snapshot_store import HAS_PYARROW, list_snapshots, load_snapshot, save_snapshot
+
+pytestmark = pytest.mark.skipif(not HAS_PYARROW, reason="pyarrow not installed")
+
+
+def test_snapshots_are_private_to_their_owner(tmp_path):
+    portfolio = pd.DataFrame({"Stock": ["INFY"], "Current Quantity": [10.0]})
+    name = save_snapshot("user:a@example.com", portfolio, label="mine", directory=tmp_path)
+
+    assert [snap["name"] for snap in list_snapshots("user:a@example.com", directory=tmp_path)] == [name]
+    assert list_snapshots("user:b@example.com", directory=tmp_path) == []
+    with pytest.raises(FileNotFoundError):
+        load_snapshot("user:b@example.com", name, directory=tmp_path)
+
+    loaded, results = load_snapshot("user:a@example.com", name, directory=tmp_path)
+    pd.testing.assert_frame_equal(loaded, portfolio)
+    assert results is None
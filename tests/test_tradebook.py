@@ -0,0 +1,44 @@
+import io
+import pytest
+import data_handler
+from data_handler import load_and_validate_files
+
+
+def upload(name, text):
+    f = io.BytesIO(text.encode())
+    f.name = name
+    return f
+
+
+@pytest.fixture(autouse=True)
+def offline_prices(monkeypatch):
+    monkeypatch.setattr(data_handler, "get_live_prices", lambda symbols: ({s: 1500.0 for s in symbols}, {}, {}))
+
+
+@pytest.mark.parametrize("method, average", [("fifo", 1200.0), ("weighted", 1100.0)])
+def test_tradebook_split_across_files_nets_out(method, average):
+    fy24 = upload("fy24.csv", "symbol,trade_type,quantity,price,trade_date\n"
+                              "INFY,buy,10,1000,2023-05-02\n"
+                              "INFY,buy,10,1200,2023-11-15\n")
+    fy25 = upload("fy25.csv", "symbol,trade_type,quantity,price,trade_date\n"
+                              "INFY,sell,15,1300,2024-06-10\n")
+
+    for files in ([fy24, fy25], [fy25, fy24]):
+        for f in files:
+            f.seek(0)
+        df, error = load_and_validate_files(files, cost_method=method)
+
+        assert error is None
+        assert df["Stock"].tolist() == ["INFY"]
+        assert df["Current Quantity"].tolist() == [5]
+        assert df["Current Average Price"].tolist() == [pytest.approx(average)]
+
+
+def test_tradebook_file_missing_columns_is_named():
+    good = upload("fy24.csv", "symbol,trade_type,quantity,price\nINFY,buy,10,1000\n")
+    bad = upload("fy25.csv", "symbol,quantity,price\nINFY,15,1300\n")
+
+    df, error = load_and_validate_files([good, bad], cost_method="fifo")
+
+    assert df is None
+    assert error == "fy25.csv: Missing tradebook columns: Side"
@@ -0,0 +1,142 @@
+import numpy as np
+import pandas as pd
+
+# Broker tradebook headers (lower-cased, spaces as underscores) -> internal names
+TRADEBOOK_COLUMNS = {
+    "symbol": "Stock",
+    "tradingsymbol": "Stock",
+    "stock": "Stock",
+    "trade_type": "Side",
+    "transaction_type": "Side",
+    "buy/sell": "Side",
+    "side": "Side",
+    "quantity": "Quantity",
+    "qty": "Quantity",
+    "price": "Price",
+    "trade_price": "Price",
+    "order_execution_time": "Time",
+    "trade_time": "Time",
+    "trade_date": "Date",
+    "date": "Date",
+}
+
+TRADEBOOK_REQUIRED = ["Stock", "Side", "Quantity", "Price"]
+
+# UI label -> cost basis method
+COST_METHODS = {
+    "Weighted average cost": "weighted",
+    "FIFO (first in, first out)": "fifo",
+}
+
+
+def normalize_tradebook(trades):
+    """
+    Renames a broker tradebook's columns via TRADEBOOK_COLUMNS and returns
+    Stock, Quantity (signed: buys positive, sells negative) and Price sorted by
+    symbol and execution time. File order breaks ties. Raises ValueError when
+    a required column is missing.
+    """
+    trades = trades.rename(columns=lambda col: str(col).strip().lower().replace(" ", "_"))
+    trades = trades.rename(columns=TRADEBOOK_COLUMNS)
+    missing_cols = [col for col in TRADEBOOK_REQUIRED if col not in trades.columns]
+    if missing_cols:
+        raise ValueError(f"Missing tradebook columns: {', '.join(missing_cols)}")
+
+    # Only the few distinct side labels are parsed, not every row
+    side = trades["Side"].astype("category")
+    first_letter = side.cat.categories.astype(str).str.strip().str.upper().str[:1]
+    signs = np.select([first_letter == "B", first_letter == "S"], [1.0, -1.0], np.nan)
+    # code -1 (blank side) picks the trailing NaN
+    sign = np.append(signs, np.nan)[side.cat.codes.to_numpy()]
+
+    quantity = pd.to_numeric(trades["Quantity"], errors="coerce").abs() * sign
+    out = pd.DataFrame({
+        "Stock": trades["Stock"].astype(str).str.strip(),
+        "Quantity": quantity,
+        "Price": pd.to_numeric(trades["Price"], errors="coerce"),
+    })
+    sort_by = ["Stock"]
+    for col in ("Date", "Time"):
+        if col in trades.columns:
+            out[col] = pd.to_datetime(trades[col], errors="coerce")
+            sort_by.append(col)
+    out = out.dropna(subset=["Quantity", "Price"])
+    return out.sort_values(sort_by, kind="stable", ignore_index=True)
+
+
+def combine_fills(fills):
+    """
+    Concatenates normalized fills from several tradebooks (e.g. one export per
+    financial year) into one history, sorted by symbol and execution time.
+    Ties keep the order of the list, so list older exports first.
+    """
+    out = pd.concat(fills, ignore_index=True)
+    sort_by = ["Stock"] + [col for col in ("Date", "Time") if col in out.columns]
+    return out.sort_values(sort_by, kind="stable", ignore_index=True)
+
+
+def holdings_from_tradebook(trades, method="weighted"):
+    """
+    Net open quantity and average cost per symbol from a tradebook, in the
+    REQUIRED_COLUMNS layout (market price left blank to be fetched).
+    holdings_from_fills does the same for already normalized fills.
+    """
+    return holdings_from_fills(normalize_tradebook(trades), method)
+
+
+def holdings_from_fills(trades, method="weighted"):
+    """
+    Holdings from the normalize_tradebook / combine_fills output.
+
+    Everything is grouped cumulative sums over the sorted fills. The running
+    position is floored at zero (selling more than was bought, e.g. with an
+    incomplete history, counts as going flat), and only the fills since a
+    symbol was last flat make up its current holding:
+    - "fifo": the sells of that stretch consume its earliest buys first, so
+      each buy keeps clip(cumulative bought - total sold, 0, qty) shares.
+    - "weighted": every buy re-averages the cost and sells leave it unchanged,
+      i.e. each sell scales the remaining cost basis by qty_after / qty_before.
+    """
+    if method not in ("weighted", "fifo"):
+        raise ValueError(f"Unknown cost method: {method}")
+
+    codes, symbols = pd.factorize(trades["Stock"], sort=True)
+    qty = trades["Quantity"].to_numpy()
+    price = trades["Price"].to_numpy()
+    by_symbol = pd.Series(codes)
+
+    # Running position with a floor at zero: S_k - min(0, min_j S_j)
+    total = pd.Series(qty).groupby(by_symbol).cumsum().to_numpy()
+    floor = np.minimum(pd.Series(total).groupby(by_symbol).cummin().to_numpy(), 0.0)
+    position = total - floor
+    before = pd.Series(position).groupby(by_symbol).shift(1, fill_value=0.0).to_numpy()
+
+    # Stretches between flat points; only each symbol's last one is still open
+    stretch = pd.Series(before <= 0).groupby(by_symbol).cumsum().to_numpy()
+    last = stretch == pd.Series(stretch).groupby(by_symbol).transform("max").to_numpy()
+    held = pd.Series(position).groupby(by_symbol).last().to_numpy()
+
+    buy = last & (qty > 0)
+    if method == "fifo":
+        sold = pd.Series(np.where(last & (qty < 0), -qty, 0.0)).groupby(by_symbol).transform("sum").to_numpy()
+        bought = pd.Series(np.where(buy, qty, 0.0)).groupby(by_symbol).cumsum().to_numpy()
+        kept = np.where(buy, np.clip(bought - sold, 0.0, qty), 0.0)
+        cost = pd.Series(kept * price).groupby(by_symbol).sum().to_numpy()
+    else:
+        # log of the cumulative sell scaling; exponents below are <= 0, so no overflow
+        with np.errstate(divide="ignore", invalid="ignore"):
+            step = np.where(last & (qty < 0) & (before > 0), np.log(position / before), 0.0)
+            scale = pd.Series(step).groupby(by_symbol).cumsum().to_numpy()
+            scale_end = pd.Series(scale).groupby(by_symbol).transform("last").to_numpy()
+            basis = np.where(buy, qty * price * np.exp(scale_end - scale), 0.0)
+        cost = pd.Series(basis).groupby(by_symbol).sum().to_numpy()
+
+    open_positions = held > 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        average = cost / held
+    return pd.DataFrame({
+        "Stock": np.asarray(symbols)[open_positions],
+        "Current Quantity": held[open_positions],
+        "Current Average Price": average[open_positions],
+        "Current Market Price": np.nan,
+    })
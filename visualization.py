@@ -2,26 +2,29 @@
 
 import streamlit as st
 import pandas as pd
-def highlight_rows(row):
-    if row["Shares to Buy"] != "N/A":
-        return ['background-color: #fff9c4'] * len(row)  # Yellow for averaging
-    elif row["Estimated Profit"] != "N/A" and float(row["Estimated Profit"]) > 0:
-        return ['background-color: #c8e6c9'] * len(row)  # Green for profit
-    elif row["Estimated Profit"] != "N/A":
-        return ['background-color: #ffcdd2'] * len(row)  # Red for loss
-    return [''] * len(row)
+import numpy as np
+def highlight_rows(df):
+    # Whole-table styling in one pass; blank (N/A) cells are missing values
+    profit = pd.to_numeric(df["Estimated Profit"], errors="coerce")
+    colors = np.select(
+        [df["Shares to Buy"].notna().to_numpy(), (profit > 0).to_numpy(), profit.notna().to_numpy()],
+        ['background-color: #fff9c4',  # Yellow for averaging
+         'background-color: #c8e6c9',  # Green for profit
+         'background-color: #ffcdd2'],  # Red for loss
+        ''
+    )
+    return pd.DataFrame(np.repeat(colors[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns)
 
 def display_results_table(df):
     st.markdown("### 📊 Averaging Result Table")
-    st.dataframe(df.style.apply(highlight_rows, axis=1))
+    st.dataframe(df.style.apply(highlight_rows, axis=None).format(na_rep="N/A"))
 
 
 def download_csv_button(df: pd.DataFrame):
-    csv = df.to_csv(index=False).encode('utf-8')
+    csv = df.to_csv(index=False, na_rep="N/A").encode('utf-8')
     st.download_button(
         label="⬇️ Download Recommendations CSV",
         data=csv,
         file_name="averaging_recommendations.csv",
         mime="text/csv"
     )
-
@@ -0,0 +1,54 @@
+import streamlit as st
+import numpy as np
+import pandas as pd
+import altair as alt
+from calculations import averaging_grid
+
+GRID_SIZE = 200
+
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def compute_whatif_grid(current_qty, current_avg_price, market_price, target_avg_price, grid_size=GRID_SIZE):
+    # Market prices from 50% to 110% of today's price, targets spanning the market
+    # price up to the current average (plus the chosen target if it sits outside)
+    market_prices, market_step = np.linspace(market_price * 0.5, market_price * 1.1, grid_size, retstep=True)
+    target_lo = min(market_prices[0], target_avg_price)
+    target_hi = max(current_avg_price, target_avg_price)
+    target_prices, target_step = np.linspace(target_lo, target_hi, grid_size, retstep=True)
+
+    shares, capital, _ = averaging_grid(current_qty, current_avg_price, market_prices, target_prices)
+
+    # Each point is drawn as the cell half a grid step either side of it, so the
+    # rects tile the chart exactly (a degenerate range gets a hairline cell)
+    m, t = np.meshgrid(market_prices, target_prices, indexing="ij")
+    m_half = market_step / 2 or 0.005
+    t_half = target_step / 2 or 0.005
+    return pd.DataFrame({
+        "Market Price": np.round(m.ravel(), 2),
+        "Target Average": np.round(t.ravel(), 2),
+        "Market Lo": m.ravel() - m_half,
+        "Market Hi": m.ravel() + m_half,
+        "Target Lo": t.ravel() - t_half,
+        "Target Hi": t.ravel() + t_half,
+        "Shares to Buy": shares.ravel(),
+        "Capital Required": np.round(capital.ravel(), 2),
+    })
+
+
+def whatif_grid_ui(current_qty, current_avg_price, market_price, target_avg_price):
+    with st.expander("🗺️ What-if Sensitivity (Market Price × Target Average)", expanded=False):
+        metric = st.radio("Show", ["Capital Required", "Shares to Buy"], horizontal=True)
+
+        grid_df = compute_whatif_grid(
+            int(current_qty), float(current_avg_price), float(market_price), float(target_avg_price)
+        )
+        chart = alt.Chart(grid_df.dropna()).mark_rect().encode(
+            x=alt.X("Market Lo:Q", title="Market Price", scale=alt.Scale(zero=False, nice=False)),
+            x2="Market Hi:Q",
+            y=alt.Y("Target Lo:Q", title="Target Average", scale=alt.Scale(zero=False, nice=False)),
+            y2="Target Hi:Q",
+            color=alt.Color(f"{metric}:Q", scale=alt.Scale(scheme="viridis", type="symlog")),
+            tooltip=["Market Price", "Target Average", "Shares to Buy", "Capital Required"],
+        )
+        st.altair_chart(chart, use_container_width=True)
+        st.caption("Blank cells are targets that cannot be reached at that market price.")